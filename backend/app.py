@@ -1,14 +1,156 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from contextlib import aclosing, asynccontextmanager
+from pathlib import Path
+from typing import Optional
+import asyncio
+import logging
+import os
 import secrets
+import json
 
 from orchestrator.main_orchestration import ChatOrchestrator
-from langchain_openai import ChatOpenAI
-from embedding_pipeline.embedder import Embedder
 from orchestrator.prompts import EQUALISER_SYSTEM_PROMPT
+from orchestrator.admission import AdmissionRejected, llm_admission
+from orchestrator.answer_cache import answer_cache
+from orchestrator.confirmation import confirmation_classifier
+from orchestrator.tokens import token_counter
+from orchestrator.intent_classifier import intent_classifier
+from orchestrator.metrics import metrics, process_rss_bytes
+from orchestrator import tracing
+from resources import DEFAULT_CHAT_MODEL, registry
+from session_store import InMemorySessionStore
+from session_snapshots import SnapshotConflict, SQLiteSnapshotStore
+from turn_coordinator import TurnCoordinator
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+def _env_number(name: str, default, cast=int):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return None if value.lower() == "none" else cast(value)
+
+
+# Per-session turn serialisation and idempotent retries
+turns = TurnCoordinator()
+
+# Durable snapshots shared by every worker on this host
+snapshots = SQLiteSnapshotStore(
+    os.getenv("SESSION_DB_PATH", Path(__file__).parent / "sessions.sqlite3")
+)
+
+
+# Event loop that saves evicted sessions; set while the app is running
+_eviction_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def on_session_evicted(session_id: str, client: ChatOrchestrator, reason: str):
+    """Called by the session store, under its lock, before a session is released.
+
+    May run on a worker thread (the TTL sweep), so the snapshot is handed
+    to the event loop and written from there without blocking either.
+    """
+
+    logger.info("Evicting session %s (%s) after %s messages, ~%s bytes",
+                session_id, reason, client.message_count, client.approx_size_bytes())
+
+    if _eviction_loop is None:
+        # No running app, e.g. a script driving the store directly
+        _save_evicted_now(session_id, client)
+        return
+
+    _eviction_loop.call_soon_threadsafe(_schedule_eviction_save, session_id, client)
+
+
+def _save_evicted_now(session_id: str, client: ChatOrchestrator):
+    turns.forget(session_id)
+    try:
+        snapshots.save(session_id, client)
+    except SnapshotConflict:
+        # Another worker has saved a newer turn; this copy has nothing to add
+        logger.info("Evicted a stale copy of session %s", session_id)
+
+
+def _schedule_eviction_save(session_id: str, client: ChatOrchestrator):
+    turns.forget(session_id)
+
+    async def save():
+        # Built on the loop, written from a thread, like every other save
+        snapshot = client.snapshot()
+        try:
+            await asyncio.to_thread(snapshots.write, session_id, snapshot, client.snapshot_version)
+        except SnapshotConflict:
+            logger.info("Evicted a stale copy of session %s", session_id)
+
+    task = asyncio.create_task(save())
+    _pending_saves.add(task)
+    task.add_done_callback(_pending_saves.discard)
+
+
+# Bounded in-memory session store
+sessions = InMemorySessionStore(
+    idle_ttl=_env_number("SESSION_IDLE_TTL_SECONDS", 1800, float),
+    max_sessions=_env_number("SESSION_MAX_COUNT", 1000),
+    max_bytes=_env_number("SESSION_MAX_BYTES", 256 * 1024 * 1024),
+    on_evict=on_session_evicted,
+)
+
+SESSION_SWEEP_INTERVAL_SECONDS = 60
+
+metrics.gauge("equaliser_sessions", "Sessions held in memory", lambda: sessions.stats()["sessions"])
+metrics.gauge("equaliser_sessions_bytes", "Approximate bytes held by in-memory sessions", lambda: sessions.stats()["approx_bytes"])
+metrics.gauge("equaliser_llm_active", "LLM calls in flight", lambda: llm_admission.stats()["active"])
+metrics.gauge("equaliser_llm_queued", "LLM calls waiting for a slot", lambda: llm_admission.stats()["queued"])
+metrics.gauge("equaliser_answer_cache_entries", "Retrieval results held in the semantic answer cache", lambda: len(answer_cache))
+metrics.gauge("equaliser_process_rss_bytes", "Resident set size of this worker", process_rss_bytes)
+
+
+async def _sweep_sessions():
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL_SECONDS)
+        # Scanning many idle sessions under the store lock shouldn't hold up the loop
+        await asyncio.to_thread(sessions.evict_expired)
+
+
+async def _warm_up():
+    # Heavy clients and models load lazily; build them in the background after
+    # startup so the worker accepts traffic immediately and early requests stay fast
+    for name, warm in (
+        ("shared clients", registry.warm),
+        ("confirmation classifier", confirmation_classifier.warm),
+        ("local intent classifier", intent_classifier.warm),
+        ("tokenizer", token_counter(DEFAULT_CHAT_MODEL).warm),
+    ):
+        try:
+            await asyncio.to_thread(warm)
+        except Exception:
+            logger.warning("Could not warm the %s; it will load on first use", name, exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _eviction_loop
+
+    tracing.exporter = tracing.configured_exporter()
+    _eviction_loop = asyncio.get_running_loop()
+    sweeper = asyncio.create_task(_sweep_sessions())
+    warmup = asyncio.create_task(_warm_up())
+    yield
+    warmup.cancel()
+    sweeper.cancel()
+    _eviction_loop = None
+    await registry.aclose()
+    snapshots.close()
+    if tracing.exporter is not None:
+        tracing.exporter.shutdown()
+        tracing.exporter = None
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -19,9 +161,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory session store
-sessions: dict[str, ChatOrchestrator] = {}
 
+@app.exception_handler(SnapshotConflict)
+async def snapshot_conflict(request, exc: SnapshotConflict):
+    # Another worker saved a turn for this session first; a retry runs on the fresh state
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "Session was updated by another request, please retry"},
+    )
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request, exc: AdmissionRejected):
+    # LLM queue is saturated: shed load instead of letting every turn time out
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many requests in flight, please retry shortly"},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
 
 
 class SessionResponse(BaseModel):
@@ -31,6 +188,8 @@ class SessionResponse(BaseModel):
 class ChatRequest(BaseModel):
     session_id: str
     message: str
+    # Retries carrying the same key get the original turn's result
+    idempotency_key: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -39,38 +198,183 @@ class ChatResponse(BaseModel):
 
 
 
-def create_chat_session() -> ChatOrchestrator:
-    llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18")
-    assistant_llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18")
-    embedder = Embedder()
-
+def create_chat_session(session_id: str) -> ChatOrchestrator:
+    # LLM clients, pooled connections and the Chroma store are shared process-wide
     return ChatOrchestrator(
-        llm=llm,
-        assistant_llm=assistant_llm,
-        embedder=embedder,
+        **registry.session_resources(),
         system_prompt=EQUALISER_SYSTEM_PROMPT,
+        session_id=session_id,
     )
 
 
 
+# Keeps background save tasks alive until they finish
+_pending_saves: set = set()
+
+
+async def save_snapshot(session_id: str, client: ChatOrchestrator):
+    """Persist a session off the event loop; a stale copy is dropped so the next turn reloads it"""
+
+    # Built here, so background tasks on the loop can't change the state mid-write
+    snapshot = client.snapshot()
+    try:
+        version = await asyncio.to_thread(snapshots.write, session_id, snapshot, client.snapshot_version)
+    except SnapshotConflict:
+        if sessions.get(session_id) is client:
+            sessions.pop(session_id)
+        raise
+    client.snapshot_version = version
+
+
+def persist_when_settled(session_id: str, client: ChatOrchestrator):
+    """Save the session again once its background fact extraction has finished"""
+
+    async def persist():
+        await client.await_background()
+
+        # Under the turn lock so this save never races the next turn's save of the same copy
+        async with turns.session_lock(session_id):
+            # Skip if this copy has been replaced, here or by another worker
+            if client.snapshot_version != await asyncio.to_thread(snapshots.version, session_id):
+                return
+
+            if sessions.get(session_id) is client:
+                sessions.put(session_id, client)
+            try:
+                await save_snapshot(session_id, client)
+            except SnapshotConflict:
+                logger.info("Skipped background save of session %s; a newer turn was saved first", session_id)
+
+    task = asyncio.create_task(persist())
+    _pending_saves.add(task)
+    task.add_done_callback(_pending_saves.discard)
+
+
+async def load_session(session_id: str) -> Optional[ChatOrchestrator]:
+    """Return an up-to-date session, restoring it from its snapshot if this worker's copy is missing or stale"""
+
+    client = sessions.get(session_id)
+    version = await asyncio.to_thread(snapshots.version, session_id)
+
+    if version is None or (client is not None and client.snapshot_version == version):
+        return client
+
+    loaded = await asyncio.to_thread(snapshots.load, session_id)
+    if loaded is None:
+        return client
+
+    snapshot, version = loaded
+    client = create_chat_session(session_id)
+    client.restore(snapshot)
+    client.snapshot_version = version
+
+    sessions.put(session_id, client)
+    return client
+
+
 @app.post("/session", response_model=SessionResponse)
 async def create_session():
     session_id = secrets.token_urlsafe(16)
-    sessions[session_id] = create_chat_session()
+    client = create_chat_session(session_id)
+    sessions.put(session_id, client)
+    await save_snapshot(session_id, client)
     return {"session_id": session_id}
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    client = sessions.get(request.session_id)
+async def chat(request: ChatRequest, idempotency_key: Optional[str] = Header(default=None)):
+    if not await load_session(request.session_id):
+        raise HTTPException(status_code=400, detail="Invalid session")
+
+    llm_admission.ensure_capacity()
+
+    async def run_turn():
+        # Reload under the session lock in case another turn just finished
+        client = await load_session(request.session_id)
+
+        ai_message = await client.aorchestrate(request.message)
 
-    if not client:
+        # Re-measure the session now that its histories have grown
+        sessions.put(request.session_id, client)
+        await save_snapshot(request.session_id, client)
+        persist_when_settled(request.session_id, client)
+
+        return {
+            "ai_message": ai_message,
+            "complete": client.complete,
+        }
+
+    return await turns.run(
+        request.session_id,
+        request.idempotency_key or idempotency_key,
+        run_turn,
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format a single server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _stream_error_detail(exc: Exception) -> str:
+    if isinstance(exc, SnapshotConflict):
+        return "Session was updated by another request, please retry"
+    if isinstance(exc, AdmissionRejected):
+        return "Too many requests in flight, please retry shortly"
+    return "The response could not be completed, please retry"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    if not await load_session(request.session_id):
         raise HTTPException(status_code=400, detail="Invalid session")
 
-    # orchestrate is sync → safe to call directly
-    ai_message = client.orchestrate(request.message)
+    llm_admission.ensure_capacity()
+
+    async def event_stream():
+        async with turns.session_lock(request.session_id):
+            client = await load_session(request.session_id)
+            turns_before = len(client.turn_metrics)
+
+            try:
+                # Closed explicitly so a disconnect finishes the turn before the lock is released
+                async with aclosing(client.astream_orchestrate(request.message)) as stream:
+                    async for token in stream:
+                        yield _sse("token", {"text": token})
+
+                # Persisted like /chat's turns before "done", so a failed save is reported below
+                sessions.put(request.session_id, client)
+                await save_snapshot(request.session_id, client)
+                persist_when_settled(request.session_id, client)
+
+                last_turn = client.turn_metrics[-1] if len(client.turn_metrics) > turns_before else {}
+
+                yield _sse("done", {
+                    "complete": client.complete,
+                    "ttft_ms": last_turn.get("ttft_ms"),
+                })
+            except Exception as exc:
+                # Headers are already sent, so the failure is reported in-band before the stream closes
+                logger.exception("Streamed turn failed for session %s", request.session_id)
+                yield _sse("error", {"detail": _stream_error_detail(exc)})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.get("/sessions/stats")
+async def session_stats():
+    return sessions.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 
-    return {
-        "ai_message": ai_message,
-        "complete": client.complete,
-    }
+@app.get("/metrics/sessions/{session_id}")
+async def session_metrics(session_id: str):
+    totals = metrics.session_totals(session_id)
+    if totals is None:
+        raise HTTPException(status_code=404, detail="No metrics for this session")
+    return totals
@@ -0,0 +1,318 @@
+"""Local stand-in for the OpenAI chat-completions and embeddings API, for load testing.
+
+Run from backend/:
+
+    python -m benchmarks.fake_openai_server --port 8900 --latency-ms 400 --rate-429 0.02
+
+then point the backend at it:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=fake uvicorn app:app
+
+Structured-output prompts (compiled "Keys:" instructions or a
+PydanticOutputParser JSON schema) get a schema-valid JSON reply for
+MessageIntent, CaseFactsSchema / CaseFactsPatch, UserEmotions,
+FieldCompletenessTracker, QuestionSchema and ReportSkeleton; anything else
+gets plain text. Latency is log-normal around --latency-ms, streamed replies
+add --token-ms per chunk, and --rate-429 / --rate-timeout inject rate-limit
+errors and requests that never answer. GET /stats reports what was served.
+"""
+
+from collections import Counter
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+EMBEDDING_DIMENSIONS = 1536
+
+REPLY_WORDS = (
+    "I hear how stressful this has been, and it makes sense to feel unsettled while things are uncertain. "
+    "It may help to write down the key dates and what each person has said so far, and we can go through "
+    "the options that are usually open in situations like yours one step at a time."
+).split()
+
+
+def _keys(text: str) -> set:
+    """Top-level keys a structured-output prompt asks for, or an empty set for free text"""
+
+    if "Reply with one JSON object" in text:
+        section = text.split("Keys:", 1)[-1]
+        return set(re.findall(r"^(\w+):", section, flags=re.MULTILINE))
+
+    # PydanticOutputParser embeds the JSON schema between triple backticks
+    match = re.search(r"```\n(\{.*?\})\n```", text, flags=re.DOTALL)
+    if match:
+        try:
+            return set(json.loads(match.group(1)).get("properties", {}))
+        except json.JSONDecodeError:
+            pass
+
+    return set()
+
+
+class FakeResponder:
+    """Replies, latencies and injected failures drawn from one seeded RNG"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.styles = [style.split("=") for style in args.styles.split(",")]
+        self.stats = Counter()
+
+    def latency(self) -> float:
+        return self.args.latency_ms / 1000 * math.exp(self.args.latency_sigma * self.rng.gauss(0, 1))
+
+    def failure(self):
+        """None, "rate_limit" or "timeout" for the next request"""
+
+        roll = self.rng.random()
+        if roll < self.args.rate_429:
+            return "rate_limit"
+        if roll < self.args.rate_429 + self.args.rate_timeout:
+            return "timeout"
+        return None
+
+    def reply(self, messages: list) -> str:
+        text = "\n".join(_content(message) for message in messages)
+        keys = _keys(text)
+
+        if "skeleton" in keys:
+            kind, payload = "report_skeleton", self.report_skeleton()
+        elif "primary_intent" in keys:
+            kind, payload = "intent", self.intent()
+        elif "fields_filled_count" in keys:
+            kind, payload = "completeness", self.completeness()
+        elif "questions" in keys:
+            kind, payload = "questions", self.questions()
+        elif "user_emotions" in keys:
+            kind, payload = "emotions", self.emotions()
+        elif "matter_type" in keys:
+            kind, payload = "case_facts", self.case_facts()
+        else:
+            self.stats["reply_text"] += 1
+            return " ".join(REPLY_WORDS[:self.args.reply_words])
+
+        self.stats[f"reply_{kind}"] += 1
+        return json.dumps(payload)
+
+    def intent(self) -> dict:
+        styles, weights = zip(*((style, float(weight)) for style, weight in self.styles))
+        return {
+            "primary_intent": self.rng.choice(["venting", "seeking_validation", "asking_for_help", "exploring_options", "expressing_confusion"]),
+            "emotional_intensity": round(self.rng.random(), 2),
+            "needs_reassurance": self.rng.random() < 0.5,
+            "suggested_response_style": self.rng.choices(styles, weights)[0],
+        }
+
+    def case_facts(self) -> dict:
+        return {
+            "matter_type": "family_law",
+            "brief_description": "Separated after eight years of marriage; the husband claims the family home is his.",
+            "other_parties": [{"name": "Husband", "relationship": "spouse", "role": "other party"}],
+            "key_events": [{"date": "2024-05", "event_description": "Husband moved out"}],
+            "children_involved": True,
+            "state_territory": self.rng.choice(["NSW", "VIC", "QLD"]),
+            "urgency_level": "important",
+        }
+
+    def emotions(self) -> dict:
+        return {"user_emotions": self.rng.sample(["stressed", "anxious", "overwhelmed", "confused", "hopeful"], 2)}
+
+    def completeness(self) -> dict:
+        filled = self.rng.randint(1, 10)
+        return {
+            "fields_filled_count": filled,
+            "fields_total_count": 10,
+            "completeness_ratio": filled / 10,
+            "confidence_level": "low" if filled < 5 else "medium",
+            "missing_critical_fields": ["desired_outcome", "client_annual_income"] if filled < 10 else [],
+            "uncertain_fields": [],
+            "user_emotions": ["stressed"],
+        }
+
+    def questions(self) -> dict:
+        return {"questions": [
+            "Which state or territory do you live in?",
+            "What would you most like to happen with the house?",
+            "Is there a court date or deadline coming up?",
+        ]}
+
+    def report_skeleton(self) -> dict:
+        return {"skeleton": [
+            {"heading": "Client Background", "sub_headings": ["Relationship history", "Children"]},
+            {"heading": "Property and Finances", "sub_headings": ["Family home", "Income"]},
+            {"heading": "Client Objectives", "sub_headings": ["Desired outcome"]},
+        ]}
+
+
+def _content(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _embedding(value, dimensions: int) -> list:
+    """Deterministic unit vector for a string or a list of token ids"""
+
+    seed = hashlib.sha256(json.dumps(value).encode()).digest()
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(dimensions)]
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector]
+
+
+def create_app(args) -> FastAPI:
+    app = FastAPI()
+    responder = FakeResponder(args)
+
+    def error(status: int, message: str, code: str):
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": message, "type": "fake_error", "param": None, "code": code}},
+            headers={"retry-after-ms": "500"} if status == 429 else None,
+        )
+
+    async def inject_failure():
+        failure = responder.failure()
+        if failure == "rate_limit":
+            responder.stats["rate_limited"] += 1
+            return error(429, "Rate limit reached (fake server)", "rate_limit_exceeded")
+        if failure == "timeout":
+            responder.stats["timed_out"] += 1
+            await asyncio.sleep(args.hang_seconds)
+            return error(504, "Fake server timeout", "timeout")
+        return None
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        responder.stats["chat_requests"] += 1
+
+        failed = await inject_failure()
+        if failed is not None:
+            return failed
+
+        content = responder.reply(body.get("messages", []))
+        model = body.get("model", "fake-model")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        usage = {
+            "prompt_tokens": sum(_tokens(_content(message)) for message in body.get("messages", [])),
+            "completion_tokens": _tokens(content),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        await asyncio.sleep(responder.latency())
+
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "logprobs": None, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(delta: dict, finish_reason=None, **extra) -> str:
+            payload = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}], **extra,
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def stream():
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in re.findall(r"\S+\s*", content):
+                yield chunk({"content": piece})
+                await asyncio.sleep(args.token_ms / 1000)
+            yield chunk({}, "stop")
+            if include_usage:
+                yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        responder.stats["embedding_requests"] += 1
+
+        failed = await inject_failure()
+        if failed is not None:
+            return failed
+
+        inputs = body.get("input", [])
+        # A single string, or a single list of token ids, is one input
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+
+        dimensions = body.get("dimensions") or EMBEDDING_DIMENSIONS
+        data = []
+        for index, value in enumerate(inputs):
+            vector = _embedding(value, dimensions)
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"<{dimensions}f", *vector)).decode()
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+
+        await asyncio.sleep(args.embedding_latency_ms / 1000)
+
+        tokens = sum(len(value) if isinstance(value, list) else _tokens(value) for value in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake-embedding"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return dict(responder.stats)
+
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=400, help="median time before the first byte of a chat reply")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="log-normal spread; 0 for a fixed latency")
+    parser.add_argument("--token-ms", type=float, default=15, help="delay between streamed chunks")
+    parser.add_argument("--embedding-latency-ms", type=float, default=50)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--rate-timeout", type=float, default=0.0, help="fraction of requests held for --hang-seconds")
+    parser.add_argument("--hang-seconds", type=float, default=120, help="longer than the client timeout to force a timeout")
+    parser.add_argument("--styles", default="listen=0.5,educate=0.3,guide=0.2", help="suggested_response_style weights")
+    parser.add_argument("--reply-words", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main():
+    import uvicorn
+
+    args = parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
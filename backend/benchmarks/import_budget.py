@@ -0,0 +1,105 @@
+"""Import-time report and budget check for the serving entry point.
+
+Run from backend/:
+
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --module app --budget-ms 1500 --top 25
+
+Imports the module in a fresh interpreter under `python -X importtime`,
+prints the slowest top-level imports, and exits non-zero if the total
+exceeds the budget or if any ingestion-only / ML-only dependency was
+loaded eagerly.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Only needed for ingestion, local models or first use, never at import time
+DEFERRED_MODULES = [
+    "transformers",
+    "torch",
+    "trafilatura",
+    "bs4",
+    "langchain_experimental",
+    "langchain_text_splitters",
+    "langchain_chroma",
+    "chromadb",
+]
+
+
+def run_importtime(module: str) -> list:
+    """Return (self_us, cumulative_us, depth, name) for every import of module"""
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "import-budget-placeholder")
+
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def loaded_modules(module: str) -> set:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "import-budget-placeholder")
+
+    completed = subprocess.run(
+        [sys.executable, "-c", f"import json, sys, {module}; print(json.dumps(sorted(sys.modules)))"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return set(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", 1500)))
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = run_importtime(args.module)
+    total_ms = next(cum for _, cum, depth, name in reversed(rows) if depth == 0 and name == args.module) / 1000
+
+    # Direct children of the entry module show where the time goes
+    children = sorted((row for row in rows if row[2] == 1), key=lambda row: row[1], reverse=True)
+
+    print(f"Import of {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)\n")
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for self_us, cumulative_us, _, name in children[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}  {self_us / 1000:>8.1f}  {name}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import took {total_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+
+    eager = sorted(name for name in DEFERRED_MODULES if name in loaded_modules(args.module))
+    if eager:
+        failures.append(f"deferred dependencies imported eagerly: {', '.join(eager)}")
+
+    if failures:
+        print("\nFAIL: " + "; ".join(failures))
+        sys.exit(1)
+
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
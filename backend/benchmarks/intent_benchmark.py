@@ -0,0 +1,91 @@
+"""Latency and accuracy of the local intent classifier against the LLM.
+
+Run from backend/:
+
+    python -m benchmarks.intent_benchmark --log intent_turns.jsonl
+    python -m benchmarks.intent_benchmark --log intent_turns.jsonl --llm-samples 20
+
+Times single-turn local classification (as served, one text at a time)
+and sweeps the confidence threshold to show coverage (share of turns that
+skip the LLM) against accuracy on those turns, using the LLM labels in the
+log as ground truth. --llm-samples also times the LLM intent chain on a few
+logged turns for comparison; that makes real API calls.
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.stats import percentile
+from benchmarks.train_intent_classifier import evaluate, load_turns, split
+from orchestrator.intent_classifier import DEFAULT_HEADS_PATH, LocalIntentClassifier
+
+
+def time_local(classifier: LocalIntentClassifier, texts: list) -> list:
+    classifier.warm()
+
+    timings = []
+    for text in texts:
+        started = time.perf_counter()
+        classifier.predict([text])
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def time_llm(texts: list) -> list:
+    from langchain_core.messages import HumanMessage, get_buffer_string
+
+    from orchestrator.chat_analysis import ConversationAnalyser
+    from resources import registry
+
+    chain = ConversationAnalyser(registry.llm()).intent_chain
+
+    async def run():
+        timings = []
+        for text in texts:
+            started = time.perf_counter()
+            await chain.ainvoke({"history": get_buffer_string([HumanMessage(content=line) for line in text.split("\n")])})
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    return asyncio.run(run())
+
+
+def report_latency(name: str, timings: list):
+    print(f"{name:<6} p50 {percentile(timings, 50):>8.1f} ms   p95 {percentile(timings, 95):>8.1f} ms   "
+          f"p99 {percentile(timings, 99):>8.1f} ms   (n={len(timings)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", required=True)
+    parser.add_argument("--heads", default=str(DEFAULT_HEADS_PATH))
+    parser.add_argument("--eval-fraction", type=float, default=0.2, help="must match training to score held-out turns only")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-samples", type=int, default=0)
+    args = parser.parse_args()
+
+    _, held_out = split(load_turns(args.log), args.eval_fraction, args.seed)
+    if not held_out:
+        raise SystemExit("No held-out turns to benchmark")
+
+    classifier = LocalIntentClassifier(args.heads)
+    texts = [turn["text"] for turn in held_out]
+
+    print("Latency per turn")
+    report_latency("local", time_local(classifier, texts))
+    if args.llm_samples:
+        report_latency("llm", time_llm(texts[:args.llm_samples]))
+
+    print(f"\n{'threshold':>9} {'coverage':>9} {'mode acc':>9} {'intent acc':>11}")
+    for threshold in (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95):
+        result = evaluate(classifier, held_out, threshold)
+        mode_accuracy = result["confident_mode_accuracy"]
+        intent_accuracy = result["confident_primary_intent_accuracy"]
+        print(f"{threshold:>9.2f} {result['coverage']:>9.1%} "
+              f"{'-' if mode_accuracy is None else f'{mode_accuracy:.1%}':>9} "
+              f"{'-' if intent_accuracy is None else f'{intent_accuracy:.1%}':>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""Concurrent-session load test against a running backend.
+
+Run from backend/, with the backend pointed at the fake provider:
+
+    python -m benchmarks.fake_openai_server --port 8900 &
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=fake uvicorn app:app --port 8000 &
+    python -m benchmarks.load_test --users 50 --out load_results.json
+    python -m benchmarks.load_test --users 50 --stream --baseline load_results.json
+
+Each simulated user creates a session with POST /session and replays the
+user turns of MOCK_CONVERSATION through /chat (or /chat/stream with
+--stream, where a stream that ends in an error event counts as a failed
+turn), pausing for an exponentially distributed think time between
+turns. /metrics is scraped before and after the run, and periodically for
+worker RSS, so the per-stage breakdown only covers this run's traffic.
+
+The results file is JSON with stable keys, meant to be kept per commit and
+diffed; --baseline prints the change in the headline numbers against an
+earlier results file.
+"""
+
+from collections import Counter, defaultdict
+import argparse
+import asyncio
+import json
+import random
+import re
+import subprocess
+import time
+
+import httpx
+
+from benchmarks.stats import percentile
+from report_gen_ai.mock_conversation import MOCK_CONVERSATION
+
+
+USER_TURNS = [message["content"] for message in MOCK_CONVERSATION if message["role"] == "user"]
+
+_SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+
+class StreamError(httpx.HTTPError):
+    """/chat/stream answered 200 but the stream ended in an error event or without done"""
+
+
+def latency_summary(values_ms: list) -> dict:
+    if not values_ms:
+        return {"count": 0}
+    return {
+        "count": len(values_ms),
+        "mean_ms": round(sum(values_ms) / len(values_ms), 1),
+        "p50_ms": round(percentile(values_ms, 50), 1),
+        "p95_ms": round(percentile(values_ms, 95), 1),
+        "p99_ms": round(percentile(values_ms, 99), 1),
+        "max_ms": round(max(values_ms), 1),
+    }
+
+
+def parse_prometheus(text: str) -> dict:
+    """{(metric name, ((label, value), ...)): sample value} for every sample line"""
+
+    samples = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        label_pairs = tuple(sorted(re.findall(r'(\w+)="([^"]*)"', labels or "")))
+        samples[(name, label_pairs)] = float(value)
+    return samples
+
+
+def stage_breakdown(before: dict, after: dict, turns: int) -> dict:
+    """Per-stage calls, latency and LLM usage between two /metrics scrapes, summed over modes"""
+
+    stages = defaultdict(lambda: defaultdict(float))
+    fields = {
+        "equaliser_stage_calls_total": "calls",
+        "equaliser_stage_latency_seconds_sum": "seconds",
+        "equaliser_llm_calls_total": "llm_calls",
+        "equaliser_llm_prompt_tokens_total": "prompt_tokens",
+        "equaliser_llm_completion_tokens_total": "completion_tokens",
+    }
+
+    for (name, labels), value in after.items():
+        field = fields.get(name)
+        if field is None:
+            continue
+        stage = dict(labels)["stage"]
+        stages[stage][field] += value - before.get((name, labels), 0.0)
+
+    report = {}
+    for stage, totals in sorted(stages.items()):
+        if not totals["calls"]:
+            continue
+        report[stage] = {
+            "calls": int(totals["calls"]),
+            "mean_ms": round(totals["seconds"] / totals["calls"] * 1000, 1),
+            "llm_calls_per_turn": round(totals["llm_calls"] / max(turns, 1), 2),
+            "prompt_tokens_per_turn": round(totals["prompt_tokens"] / max(turns, 1), 1),
+            "completion_tokens_per_turn": round(totals["completion_tokens"] / max(turns, 1), 1),
+        }
+    return report
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+
+        self.turn_ms = []
+        self.ttft_ms = []
+        self.session_ms = []
+        self.errors = Counter()
+        self.turns_by_index = defaultdict(list)
+        self.rss = []
+
+    async def _post(self, client: httpx.AsyncClient, path: str, body: dict):
+        """POST, retrying once after Retry-After if admission control sheds the request"""
+
+        for attempt in range(2):
+            response = await client.post(path, json=body)
+            retry_after = self._retry_after(response, attempt)
+            if retry_after is None:
+                return response
+            await asyncio.sleep(retry_after)
+
+    def _retry_after(self, response: httpx.Response, attempt: int):
+        """Seconds to wait before retrying a shed request, or None to use this response"""
+
+        if response.status_code != 429 or attempt or not self.args.retry_429:
+            return None
+        return float(response.headers.get("retry-after", 1))
+
+    async def _turn(self, client: httpx.AsyncClient, session_id: str, message: str):
+        """(latency ms, time to first token ms or None) for one turn; raises on failure"""
+
+        body = {"session_id": session_id, "message": message}
+        started = time.perf_counter()
+
+        if not self.args.stream:
+            response = await self._post(client, "/chat", body)
+            response.raise_for_status()
+            return (time.perf_counter() - started) * 1000, None
+
+        for attempt in range(2):
+            async with client.stream("POST", "/chat/stream", json=body) as response:
+                retry_after = self._retry_after(response, attempt)
+                if retry_after is None:
+                    response.raise_for_status()
+                    first_token = await self._read_stream(response, started)
+                    return (time.perf_counter() - started) * 1000, first_token
+            await asyncio.sleep(retry_after)
+
+    async def _read_stream(self, response: httpx.Response, started: float):
+        """Time to first token in ms; raises StreamError unless the stream ends with done"""
+
+        first_token = None
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                if event == "token" and first_token is None:
+                    first_token = (time.perf_counter() - started) * 1000
+            elif line.startswith("data: ") and event == "error":
+                raise StreamError(json.loads(line[len("data: "):]).get("detail", "error event"))
+
+        if event != "done":
+            raise StreamError("stream ended without a done event")
+        return first_token
+
+    async def user(self, client: httpx.AsyncClient, delay: float):
+        await asyncio.sleep(delay)
+
+        started = time.perf_counter()
+        try:
+            response = await self._post(client, "/session", {})
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            self.errors[_error_kind(exc)] += 1
+            return
+        self.session_ms.append((time.perf_counter() - started) * 1000)
+        session_id = response.json()["session_id"]
+
+        for index, message in enumerate(USER_TURNS[:self.args.turns]):
+            await asyncio.sleep(self.rng.expovariate(1000 / self.args.think_ms) if self.args.think_ms else 0)
+
+            try:
+                latency, ttft = await self._turn(client, session_id, message)
+            except httpx.HTTPError as exc:
+                self.errors[_error_kind(exc)] += 1
+                continue
+
+            self.turn_ms.append(latency)
+            self.turns_by_index[index].append(latency)
+            if ttft is not None:
+                self.ttft_ms.append(ttft)
+
+    async def scrape(self, client: httpx.AsyncClient) -> dict:
+        response = await client.get("/metrics")
+        response.raise_for_status()
+        return parse_prometheus(response.text)
+
+    async def watch_rss(self, client: httpx.AsyncClient, started: float):
+        while True:
+            try:
+                samples = await self.scrape(client)
+                self.rss.append({
+                    "t_s": round(time.perf_counter() - started, 1),
+                    "rss_bytes": int(samples.get(("equaliser_process_rss_bytes", ()), 0)),
+                    "sessions": int(samples.get(("equaliser_sessions", ()), 0)),
+                })
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(self.args.rss_interval)
+
+    async def run(self) -> dict:
+        args = self.args
+        limits = httpx.Limits(max_connections=args.users + 4, max_keepalive_connections=args.users + 4)
+
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+            before = await self.scrape(client)
+
+            started = time.perf_counter()
+            watcher = asyncio.create_task(self.watch_rss(client, started))
+            await asyncio.gather(*(
+                self.user(client, args.ramp_seconds * i / max(args.users - 1, 1))
+                for i in range(args.users)
+            ))
+            elapsed = time.perf_counter() - started
+            watcher.cancel()
+
+            after = await self.scrape(client)
+
+        attempted = len(self.turn_ms) + sum(self.errors.values())
+        rss = [sample["rss_bytes"] for sample in self.rss]
+
+        return {
+            "config": {
+                "base_url": args.base_url, "users": args.users, "turns_per_user": min(args.turns, len(USER_TURNS)),
+                "think_ms": args.think_ms, "ramp_seconds": args.ramp_seconds, "stream": args.stream, "seed": args.seed,
+            },
+            "commit": _git_commit(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "duration_s": round(elapsed, 2),
+            "throughput_turns_per_s": round(len(self.turn_ms) / elapsed, 2),
+            "turns": latency_summary(self.turn_ms),
+            "ttft": latency_summary(self.ttft_ms),
+            "session_create": latency_summary(self.session_ms),
+            "turns_by_index": {str(index): latency_summary(values) for index, values in sorted(self.turns_by_index.items())},
+            "errors": dict(self.errors),
+            "error_rate": round(sum(self.errors.values()) / attempted, 4) if attempted else 0.0,
+            "stages": stage_breakdown(before, after, len(self.turn_ms)),
+            "rss": {
+                "start_bytes": rss[0] if rss else None,
+                "peak_bytes": max(rss) if rss else None,
+                "end_bytes": int(after.get(("equaliser_process_rss_bytes", ()), 0)),
+                "samples": self.rss,
+            },
+        }
+
+
+def _error_kind(exc: httpx.HTTPError) -> str:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return f"http_{exc.response.status_code}"
+    if isinstance(exc, StreamError):
+        return "stream_error"
+    return type(exc).__name__
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: dict, baseline=None):
+    def delta(path):
+        if baseline is None:
+            return ""
+        old, new = baseline, results
+        for key in path:
+            old, new = (old or {}).get(key), (new or {}).get(key)
+        if not old or new is None:
+            return ""
+        return f"  ({(new - old) / old:+.1%} vs {baseline.get('commit') or 'baseline'})"
+
+    turns = results["turns"]
+    print(f"{results['config']['users']} users, {turns['count']} turns in {results['duration_s']}s")
+    print(f"throughput   {results['throughput_turns_per_s']} turns/s{delta(['throughput_turns_per_s'])}")
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        if key in turns:
+            print(f"turn {key[:3]}     {turns[key]} ms{delta(['turns', key])}")
+    if results["ttft"]["count"]:
+        print(f"ttft p50     {results['ttft']['p50_ms']} ms{delta(['ttft', 'p50_ms'])}")
+    print(f"error rate   {results['error_rate']:.2%} {results['errors'] or ''}")
+    if results["rss"]["peak_bytes"]:
+        print(f"peak RSS     {results['rss']['peak_bytes'] / 2**20:.0f} MiB{delta(['rss', 'peak_bytes'])}")
+
+    print(f"\n{'stage':<18} {'calls':>7} {'mean ms':>9} {'llm/turn':>9} {'prompt tok/turn':>16}")
+    for stage, row in results["stages"].items():
+        print(f"{stage:<18} {row['calls']:>7} {row['mean_ms']:>9} {row['llm_calls_per_turn']:>9} {row['prompt_tokens_per_turn']:>16}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=len(USER_TURNS), help="user turns replayed per session")
+    parser.add_argument("--think-ms", type=float, default=1000, help="mean pause between a reply and the next message")
+    parser.add_argument("--ramp-seconds", type=float, default=5, help="spread session starts over this long")
+    parser.add_argument("--stream", action="store_true", help="use /chat/stream and record time to first token")
+    parser.add_argument("--retry-429", action="store_true", help="retry once after Retry-After when load is shed")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--rss-interval", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="load_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    results = asyncio.run(LoadTest(args).run())
+
+    with open(args.out, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+    print_report(results, baseline)
+    print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Prompt tokens per stage with full JSON Schema vs. compiled format instructions.
+
+Run from backend/:
+
+    python -m benchmarks.prompt_tokens
+
+Renders each structured-output prompt twice for the same sample turn: once
+with PydanticOutputParser's JSON Schema instructions (the previous
+behaviour) and once with the compiled instructions now in use. Counts use
+the same TokenCounter as the context budgets.
+"""
+
+import argparse
+
+from langchain_core.messages import AIMessage, HumanMessage, get_buffer_string
+from langchain_core.output_parsers import PydanticOutputParser
+
+from orchestrator.prompts import EMOTIONS_PROMPT, FACTS_PROMPT, GUIDE_PROMPT, INTENT_PROMPT
+from orchestrator.schemas import CaseFactsPatch, FieldCompletenessTracker, MessageIntent, QuestionSchema, UserEmotions
+from orchestrator.tokens import token_counter
+from resources import DEFAULT_CHAT_MODEL
+
+
+SAMPLE_HISTORY = [
+    AIMessage(content="Hello, I'm Equaliser. What brings you here today?"),
+    HumanMessage(content="My husband moved out a few weeks ago and now he's saying the house is his and that I might have to leave."),
+    AIMessage(content="That sounds really stressful. Do you have children together?"),
+    HumanMessage(content="Yes, two kids, 8 and 11. They're living with me for now."),
+]
+
+
+def stage_prompts():
+    """(stage, schema, prompt template, inputs) for every structured-output call"""
+
+    tracker = FieldCompletenessTracker()
+    history = get_buffer_string(SAMPLE_HISTORY)
+    new_messages = get_buffer_string(SAMPLE_HISTORY[2:])
+
+    return [
+        ("intent", MessageIntent, INTENT_PROMPT, {"history": history}),
+        ("fact_extraction", CaseFactsPatch, FACTS_PROMPT, {"history": new_messages, "context": get_buffer_string(SAMPLE_HISTORY[1:2])}),
+        ("emotions", UserEmotions, EMOTIONS_PROMPT, {"history": new_messages}),
+        ("guide", QuestionSchema, GUIDE_PROMPT, {
+            "history": history, "input": SAMPLE_HISTORY[-1].content, "intent": "asking_for_help",
+            "missing": tracker.missing_critical_fields, "unclear": tracker.uncertain_fields,
+        }),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_CHAT_MODEL)
+    args = parser.parse_args()
+
+    counter = token_counter(args.model)
+    counter.warm()
+    if counter.estimating:
+        print("tiktoken unavailable; estimating 4 characters per token\n")
+    count = counter.count
+
+    print(f"{'stage':<16} {'before':>8} {'after':>8} {'saved':>8}")
+    total_before = total_after = 0
+
+    for stage, schema, template, inputs in stage_prompts():
+        full_schema = PydanticOutputParser(pydantic_object=schema).get_format_instructions()
+
+        before = count(template.partial(format=full_schema).format(**inputs))
+        after = count(template.format(**inputs))
+        total_before += before
+        total_after += after
+
+        print(f"{stage:<16} {before:>8} {after:>8} {1 - after / before:>8.0%}")
+
+    print(f"{'total':<16} {total_before:>8} {total_after:>8} {1 - total_after / total_before:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark /session latency and RSS growth.
+
+Run from backend/:
+
+    python -m benchmarks.session_benchmark --sessions 1000
+    python -m benchmarks.session_benchmark --sessions 1000 --per-session-clients
+
+The second form rebuilds every client per session, matching the old
+behaviour of create_chat_session, for comparison. Snapshots go to a
+temporary database, and the session cap is lifted above --sessions so
+eviction is not part of what is timed.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# Clients are constructed but never called, so a placeholder key is enough
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-placeholder")
+# Never write benchmark sessions into the real snapshot database
+os.environ["SESSION_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="session-benchmark-"), "sessions.sqlite3")
+
+from fastapi.testclient import TestClient
+
+from benchmarks.stats import percentile
+import app as app_module
+from resources import ResourceRegistry
+from orchestrator.metrics import process_rss_bytes as rss_bytes
+
+
+def run(sessions: int, per_session_clients: bool) -> dict:
+    client = TestClient(app_module.app)
+
+    app_module.sessions.max_sessions = sessions + 1
+    app_module.sessions.max_bytes = None
+
+    # Warm up imports and the shared registry so they are not billed to session one
+    client.post("/session")
+    app_module.sessions.clear()
+
+    rss_before = rss_bytes()
+    latencies_ms = []
+
+    for _ in range(sessions):
+        if per_session_clients:
+            app_module.registry = ResourceRegistry()
+
+        started = time.perf_counter()
+        response = client.post("/session")
+        latencies_ms.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+
+    rss_after = rss_bytes()
+
+    return {
+        "mode": "per-session clients" if per_session_clients else "shared registry",
+        "sessions": sessions,
+        "p50_ms": statistics.median(latencies_ms),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+        "rss_growth_mb_per_1000": (rss_after - rss_before) / (1024 * 1024) * 1000 / sessions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--per-session-clients", action="store_true",
+                        help="Build fresh clients for every session (previous behaviour)")
+    args = parser.parse_args()
+
+    result = run(args.sessions, args.per_session_clients)
+
+    for key, value in result.items():
+        print(f"{key:>24}: {value:.2f}" if isinstance(value, float) else f"{key:>24}: {value}")
+
+
+if __name__ == "__main__":
+    main()
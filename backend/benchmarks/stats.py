@@ -0,0 +1,9 @@
+"""Summary statistics shared by the benchmark scripts"""
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of values, pct in 0-100"""
+
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
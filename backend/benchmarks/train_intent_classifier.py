@@ -0,0 +1,162 @@
+"""Train and evaluate the local intent classifier heads on logged turns.
+
+Run from backend/, after collecting turns with INTENT_LOG_PATH set:
+
+    python -m benchmarks.train_intent_classifier --log intent_turns.jsonl
+    python -m benchmarks.train_intent_classifier --log intent_turns.jsonl --out /tmp/heads.npz --threshold 0.85
+
+Each logged turn holds the classified text and the LLM's MessageIntent.
+Texts are embedded with the sentence encoder, softmax heads are fitted for
+primary_intent, suggested_response_style and needs_reassurance and a ridge
+regression for emotional_intensity. The held-out split is then scored with
+the same inference code the app uses.
+"""
+
+from pathlib import Path
+from typing import get_args
+import argparse
+import glob
+import json
+import random
+
+from orchestrator.intent_classifier import DEFAULT_ENCODER, DEFAULT_HEADS_PATH, LocalIntentClassifier, SentenceEncoder
+from orchestrator.schemas import MessageIntent
+
+
+LABELS = {
+    "primary_intent": list(get_args(MessageIntent.model_fields["primary_intent"].annotation)),
+    "suggested_response_style": list(get_args(MessageIntent.model_fields["suggested_response_style"].annotation)),
+    "needs_reassurance": [False, True],
+}
+
+
+def load_turns(pattern: str) -> list:
+    """Logged turns from the log file and its rotated backups, one record per distinct text"""
+
+    turns = {}
+    for path in sorted(glob.glob(pattern) + glob.glob(f"{pattern}.*")):
+        with open(path, encoding="utf-8") as log:
+            for line in log:
+                record = json.loads(line)
+                turns[record["text"]] = record  # latest label wins
+    return list(turns.values())
+
+
+def split(turns: list, eval_fraction: float, seed: int):
+    shuffled = turns[:]
+    random.Random(seed).shuffle(shuffled)
+    cut = int(len(shuffled) * (1 - eval_fraction))
+    return shuffled[:cut], shuffled[cut:]
+
+
+def encode(encoder: SentenceEncoder, texts: list, batch_size: int = 32):
+    import numpy as np
+
+    return np.concatenate([encoder.encode(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+
+
+def fit_softmax(features, targets, classes: int, epochs: int, lr: float, l2: float):
+    """Multinomial logistic regression by full-batch gradient descent"""
+
+    import numpy as np
+
+    samples, dims = features.shape
+    weights = np.zeros((dims, classes))
+    bias = np.zeros(classes)
+    one_hot = np.eye(classes)[targets]
+
+    for _ in range(epochs):
+        logits = features @ weights + bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        error = (probs - one_hot) / samples
+        weights -= lr * (features.T @ error + l2 * weights)
+        bias -= lr * error.sum(axis=0)
+
+    return weights, bias
+
+
+def fit_ridge(features, targets, l2: float):
+    import numpy as np
+
+    design = np.hstack([features, np.ones((len(features), 1))])
+    solution = np.linalg.solve(design.T @ design + l2 * np.eye(design.shape[1]), design.T @ targets)
+    return solution[:-1], solution[-1:]
+
+
+def train_heads(features, turns: list, encoder_name: str, epochs: int, lr: float, l2: float) -> dict:
+    import numpy as np
+
+    heads = {"encoder": np.array(encoder_name)}
+
+    for name, labels in LABELS.items():
+        targets = np.array([labels.index(turn[name]) for turn in turns])
+        heads[f"{name}_W"], heads[f"{name}_b"] = fit_softmax(features, targets, len(labels), epochs, lr, l2)
+        heads[f"{name}_labels"] = np.array([str(label) for label in labels])
+
+    intensity = np.array([float(turn["emotional_intensity"]) for turn in turns])
+    heads["emotional_intensity_W"], heads["emotional_intensity_b"] = fit_ridge(features, intensity, l2)
+
+    return heads
+
+
+def evaluate(classifier: LocalIntentClassifier, turns: list, threshold: float) -> dict:
+    """Accuracy of every head, plus coverage and mode accuracy above the confidence threshold"""
+
+    predictions = classifier.predict([turn["text"] for turn in turns])
+
+    def accuracy(pairs):
+        pairs = list(pairs)
+        return sum(predicted == actual for predicted, actual in pairs) / len(pairs) if pairs else None
+
+    confident = [(intent, turn) for (intent, confidence), turn in zip(predictions, turns) if confidence >= threshold]
+
+    return {
+        "eval_turns": len(turns),
+        "primary_intent_accuracy": accuracy((p.primary_intent, t["primary_intent"]) for (p, _), t in zip(predictions, turns)),
+        "mode_accuracy": accuracy((p.suggested_response_style, t["suggested_response_style"]) for (p, _), t in zip(predictions, turns)),
+        "needs_reassurance_accuracy": accuracy((p.needs_reassurance, t["needs_reassurance"]) for (p, _), t in zip(predictions, turns)),
+        "emotional_intensity_mae": sum(abs(p.emotional_intensity - t["emotional_intensity"]) for (p, _), t in zip(predictions, turns)) / len(turns),
+        "threshold": threshold,
+        "coverage": len(confident) / len(turns),
+        "confident_mode_accuracy": accuracy((p.suggested_response_style, t["suggested_response_style"]) for p, t in confident),
+        "confident_primary_intent_accuracy": accuracy((p.primary_intent, t["primary_intent"]) for p, t in confident),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", required=True, help="turn log written via INTENT_LOG_PATH")
+    parser.add_argument("--out", default=str(DEFAULT_HEADS_PATH))
+    parser.add_argument("--encoder", default=DEFAULT_ENCODER)
+    parser.add_argument("--eval-fraction", type=float, default=0.2)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--epochs", type=int, default=500)
+    parser.add_argument("--lr", type=float, default=2.0)
+    parser.add_argument("--l2", type=float, default=1e-3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import numpy as np
+
+    turns = load_turns(args.log)
+    train, held_out = split(turns, args.eval_fraction, args.seed)
+    if not train or not held_out:
+        raise SystemExit(f"Need more logged turns to train and evaluate (found {len(turns)})")
+
+    encoder = SentenceEncoder(args.encoder)
+    heads = train_heads(encode(encoder, [turn["text"] for turn in train]), train, args.encoder, args.epochs, args.lr, args.l2)
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    np.savez(args.out, **heads)
+    print(f"Trained on {len(train)} turns, saved heads to {args.out}\n")
+
+    report = evaluate(LocalIntentClassifier(args.out, threshold=args.threshold, encoder=encoder), held_out, args.threshold)
+    for key, value in report.items():
+        print(f"{key:>34}: {value:.3f}" if isinstance(value, float) else f"{key:>34}: {value}")
+
+
+if __name__ == "__main__":
+    main()
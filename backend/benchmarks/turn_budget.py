@@ -0,0 +1,202 @@
+"""Replay a golden transcript offline and check per-turn LLM call and token budgets.
+
+Run from backend/:
+
+    python -m benchmarks.turn_budget
+    python -m benchmarks.turn_budget --out turn_costs.json --budgets benchmarks/turn_budgets.json
+
+The user turns of MOCK_CONVERSATION go through ChatOrchestrator.aorchestrate
+against a stub chat model that answers every structured-output prompt with
+schema-valid JSON (the fake provider's responder) and reports prompt and
+completion tokens as characters / 4, so counts are deterministic and need
+no tokenizer download. The session's token counter is never warmed, so
+history folding and prompt trimming use the same 4-characters-per-token
+estimate wherever this runs. Each turn's LLM calls and tokens are read per stage
+from its trace, including the background fact extraction it schedules.
+
+Exits non-zero if any turn or stage exceeds turn_budgets.json, which is
+what orchestrator/test_turn_budget.py asserts too. Raise a budget in the
+same change that adds the cost, so the increase is reviewed.
+"""
+
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+import argparse
+import asyncio
+import json
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from benchmarks.fake_openai_server import FakeResponder, parse_args as fake_server_args
+from orchestrator import tracing
+from orchestrator.intent_classifier import LocalIntentClassifier
+from orchestrator.main_orchestration import ChatOrchestrator
+from orchestrator.prompts import EQUALISER_SYSTEM_PROMPT
+from orchestrator.tokens import TokenCounter
+from report_gen_ai.mock_conversation import MOCK_CONVERSATION
+
+
+DEFAULT_BUDGETS_PATH = Path(__file__).parent / "turn_budgets.json"
+
+USER_TURNS = [message["content"] for message in MOCK_CONVERSATION if message["role"] == "user"]
+
+USAGE_FIELDS = ("llm_calls", "prompt_tokens", "completion_tokens")
+
+
+def approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StubChatModel(BaseChatModel):
+    """Offline chat model with schema-valid replies and deterministic token usage"""
+
+    responder: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        content = self.responder.reply([{"content": str(message.content)} for message in messages])
+        usage = {
+            "input_tokens": sum(approx_tokens(str(message.content)) for message in messages),
+            "output_tokens": approx_tokens(content),
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content, usage_metadata=usage))])
+
+
+class StubEmbedder:
+    """In-memory stand-in for the Chroma-backed Embedder"""
+
+    def __init__(self):
+        self.embeddings_model = DeterministicFakeEmbedding(size=64)
+        self.vectordb = InMemoryVectorStore(self.embeddings_model)
+        self.vectordb.add_texts([
+            "Property acquired during a marriage is generally considered in a property settlement.",
+            "Applications for property settlement must usually be filed within 12 months of a divorce order.",
+        ])
+        self.retriever = self.vectordb.as_retriever(search_type="mmr", search_kwargs={"k": 1})
+
+    def collection_version(self):
+        return 0
+
+
+class SpanRecorder:
+    """Exporter that keeps finished spans in memory"""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span.to_dict())
+
+
+async def replay(user_turns=USER_TURNS, seed: int = 0) -> list:
+    """Per-turn mode, LLM calls and tokens, in total and per stage"""
+
+    llm = StubChatModel(responder=FakeResponder(fake_server_args(["--seed", str(seed)])))
+    client = ChatOrchestrator(llm=llm, assistant_llm=llm, embedder=StubEmbedder(),
+                              system_prompt=EQUALISER_SYSTEM_PROMPT, session_id="turn-budget")
+    # Budgets cover the worst case, where the local intent classifier defers every turn to the LLM
+    client.analyser.local_intent = LocalIntentClassifier(heads_path=Path(__file__).parent / "no-intent-heads.npz")
+    # A counter of its own that is never warmed, so it always estimates rather than tokenising
+    client.memory.counter = client.responder.assembler.counter = TokenCounter()
+
+    recorder, previous_exporter = SpanRecorder(), tracing.exporter
+    tracing.exporter = recorder
+    try:
+        for message in user_turns:
+            await client.aorchestrate(message)
+            # The completion check it schedules is part of the turn's cost
+            await client.await_background()
+            if client.complete:
+                break
+    finally:
+        tracing.exporter = previous_exporter
+
+    traces = defaultdict(list)
+    for span in recorder.spans:
+        traces[span["trace_id"]].append(span)
+
+    turns = []
+    for spans in traces.values():
+        root = next((span for span in spans if span["name"] == "orchestrate"), None)
+        if root is None:
+            continue
+
+        stages = defaultdict(lambda: dict.fromkeys(USAGE_FIELDS, 0))
+        for span in spans:
+            if span["attributes"].get("llm_calls"):
+                for field in USAGE_FIELDS:
+                    stages[span["name"]][field] += span["attributes"].get(field, 0)
+
+        turns.append({
+            "turn": root["attributes"]["message_count"],
+            "mode": root["attributes"].get("mode"),
+            **{field: sum(stage[field] for stage in stages.values()) for field in USAGE_FIELDS},
+            "stages": dict(stages),
+        })
+
+    return sorted(turns, key=lambda turn: turn["turn"])
+
+
+def load_budgets(path=DEFAULT_BUDGETS_PATH) -> dict:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def over_budget(turns: list, budgets: dict) -> list:
+    """Human-readable description of every budget exceeded"""
+
+    violations = []
+    for turn in turns:
+        for field, limit in budgets.get("turn", {}).items():
+            if turn[field] > limit:
+                violations.append(f"turn {turn['turn']} ({turn['mode']}): {field} {turn[field]} > {limit}")
+
+        for stage, usage in turn["stages"].items():
+            limits = budgets.get("stages", {}).get(stage)
+            if limits is None:
+                violations.append(f"turn {turn['turn']}: stage {stage} makes LLM calls but has no budget")
+                continue
+            for field, limit in limits.items():
+                if usage[field] > limit:
+                    violations.append(f"turn {turn['turn']} ({turn['mode']}): {stage} {field} {usage[field]} > {limit}")
+
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budgets", default=str(DEFAULT_BUDGETS_PATH))
+    parser.add_argument("--seed", type=int, default=0, help="seeds the stub's replies, including the suggested mode")
+    parser.add_argument("--out", help="write per-turn costs as JSON")
+    args = parser.parse_args()
+
+    turns = asyncio.run(replay(seed=args.seed))
+
+    print(f"{'turn':>4} {'mode':<8} {'llm calls':>9} {'prompt tok':>10} {'completion tok':>14}  stages")
+    for turn in turns:
+        stages = ", ".join(f"{stage}={usage['llm_calls']}" for stage, usage in turn["stages"].items())
+        print(f"{turn['turn']:>4} {turn['mode'] or '-':<8} {turn['llm_calls']:>9} {turn['prompt_tokens']:>10} "
+              f"{turn['completion_tokens']:>14}  {stages}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as file:
+            json.dump(turns, file, indent=2)
+
+    violations = over_budget(turns, load_budgets(args.budgets))
+    for violation in violations:
+        print(f"OVER BUDGET: {violation}")
+    raise SystemExit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
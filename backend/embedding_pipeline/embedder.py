@@ -1,17 +1,13 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_experimental.text_splitter import SemanticChunker 
+# Serving only needs retrieval. Chroma is imported when an Embedder is built,
+# and the ingestion-only dependencies (text splitters, SemanticChunker,
+# trafilatura) are imported inside the methods that use them.
 from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
-from langchain_core.vectorstores import InMemoryVectorStore
-from langchain.schema import Document
-from bs4 import BeautifulSoup
-from trafilatura import fetch_url, extract,bare_extraction
+from langchain_core.documents import Document
 from dotenv import load_dotenv
 from pathlib import Path
-import subprocess
-import json
+import copy
 import os
-import re
+import time
 
 
 
@@ -24,29 +20,63 @@ load_dotenv(dotenv_path)
 openai_api = os.getenv("OPENAI_API")
 headers = os.getenv("USER-AGENT")
 
+CHROMA_DIR = Path("~/embedding_pipeline/chroma").expanduser()
+# langchain_chroma's default collection name, which existing stores were ingested into
+COLLECTION_NAME = "langchain"
+
 
 class Embedder:
-    def __init__(self):
-        self.embeddings_model = OpenAIEmbeddings(
+    def __init__(self, embeddings_model=None):
+        self.embeddings_model = embeddings_model or OpenAIEmbeddings(
             model="text-embedding-3-small"
         )
 
+        import chromadb
+        from langchain_chroma import Chroma
+
+        # Kept so the collection can be re-read without reaching into the Chroma wrapper
+        self.chroma_client = chromadb.PersistentClient(path=str(CHROMA_DIR))
+
         self.vectordb = Chroma(
-            persist_directory=Path("~/embedding_pipeline/chroma").expanduser(),
+            client=self.chroma_client,
+            collection_name=COLLECTION_NAME,
             embedding_function=self.embeddings_model
         )
 
-        self.in_mem_vectordb = InMemoryVectorStore(
-            embedding = self.embeddings_model
-        )
+        # Per-session scratch store, only built if short-term embedding is used
+        self._in_mem_vectordb = None
 
         self.retriever = self.vectordb.as_retriever(
             search_type="mmr",
             search_kwargs={"k": 1})
-        
-    
-        
+
+    @property
+    def in_mem_vectordb(self):
+        if self._in_mem_vectordb is None:
+            from langchain_core.vectorstores import InMemoryVectorStore
+
+            self._in_mem_vectordb = InMemoryVectorStore(
+                embedding = self.embeddings_model
+            )
+        return self._in_mem_vectordb
+
+    def collection_version(self):
+        """Changes whenever the Chroma collection is re-ingested, e.g. to invalidate cached retrievals"""
+
+        # Re-read rather than use the cached collection, ingestion runs in another process
+        collection = self.chroma_client.get_collection(COLLECTION_NAME)
+        return (collection.metadata or {}).get("ingested_at"), collection.count()
+
+    def session_view(self):
+        """Lightweight per-session copy sharing the embedding model, Chroma client and retriever"""
+
+        view = copy.copy(self)
+        view._in_mem_vectordb = None
+        return view
+
     def embed_short_term(self, chat_history_as_str):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        from langchain_experimental.text_splitter import SemanticChunker
 
         hard_splitter = RecursiveCharacterTextSplitter(
             chunk_size=100,     
@@ -78,7 +108,11 @@ class Embedder:
 
 
     def load_site_into_db(self):
-        
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        from langchain_experimental.text_splitter import SemanticChunker
+        from langchain_chroma import Chroma
+        from trafilatura import fetch_url, bare_extraction
+
         hard_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1200,     # hard ceiling
             chunk_overlap=150
@@ -126,9 +160,15 @@ class Embedder:
         semantic_documents = semantic_splitter.split_documents(raw_documents)
         final_documents = final_splitter.split_documents(semantic_documents)
 
-        db = Chroma.from_documents(
+        Chroma.from_documents(
             documents=final_documents,
             embedding=self.embeddings_model,
-            persist_directory=Path("~/embedding_pipeline/chroma").expanduser()
+            client=self.chroma_client,
+            collection_name=COLLECTION_NAME,
         )
 
+        # Stamp the collection so serving processes drop retrievals cached before this ingest
+        collection = self.chroma_client.get_collection(COLLECTION_NAME)
+        metadata = {key: value for key, value in (collection.metadata or {}).items() if not key.startswith("hnsw:")}
+        collection.modify(metadata={**metadata, "ingested_at": time.time()})
+
@@ -1,7 +1,6 @@
 from orchestrator.main_orchestration import ChatOrchestrator
-from langchain_openai import ChatOpenAI
-from embedding_pipeline.embedder import Embedder
 from orchestrator.prompts import EQUALISER_SYSTEM_PROMPT
+from resources import registry
 from flask import Flask, request, jsonify
 import secrets
 
@@ -17,15 +16,10 @@ def main():
 
     uuid = secrets.token_urlsafe(16)
     store[uuid] = None
-    llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18")
-    assistant_llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18")  # Or keep Ollama
-    embedder = Embedder()
-
     client = ChatOrchestrator(
-        llm=llm,
-        assistant_llm=assistant_llm,
-        embedder=embedder,
-        system_prompt=EQUALISER_SYSTEM_PROMPT
+        **registry.session_resources(),
+        system_prompt=EQUALISER_SYSTEM_PROMPT,
+        session_id=uuid,
     )
     user_message = None
     # Manually call the step that determines the user context
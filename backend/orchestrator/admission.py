@@ -0,0 +1,183 @@
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+
+
+class Priority(IntEnum):
+    """Lower values are admitted first"""
+    CHAT = 0
+    REPORT = 10
+
+
+class AdmissionRejected(Exception):
+    """Raised when the LLM queue is saturated; callers should retry later"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"LLM capacity exhausted, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "loop", "future", "event", "granted", "cancelled")
+
+    def __init__(self, priority, seq, loop=None, future=None, event=None):
+        self.priority = priority
+        self.seq = seq
+        self.loop = loop
+        self.future = future
+        self.event = event
+        self.granted = False
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class LLMAdmissionController:
+    """Process-wide limit on in-flight LLM calls with a bounded priority queue.
+
+    At most max_concurrent calls run at once. Further callers wait in a queue
+    ordered by Priority (live chat before reports). Entry points call
+    ensure_capacity() before starting a turn, which rejects new work with
+    AdmissionRejected once max_queued callers are waiting; calls made by a turn
+    that was already admitted always queue so a turn is never abandoned
+    half-way. Works for both async and sync call sites.
+    """
+
+    def __init__(self, max_concurrent: int = 16, max_queued: int = 64):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+
+        # Smoothed time a slot is held, used for Retry-After estimates
+        self._avg_hold_seconds = 1.0
+        self._rejected = 0
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.CHAT):
+        """Hold one LLM slot for the duration of the block"""
+
+        await self.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    @contextmanager
+    def sync_slot(self, priority: Priority = Priority.CHAT):
+        """Blocking variant of slot for synchronous call sites"""
+
+        self.acquire_sync(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    async def acquire(self, priority: Priority = Priority.CHAT):
+        loop = asyncio.get_running_loop()
+        waiter = self._admit(priority, loop=loop, future=loop.create_future())
+        if waiter is None:
+            return
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    def acquire_sync(self, priority: Priority = Priority.CHAT):
+        waiter = self._admit(priority, event=threading.Event())
+        if waiter is not None:
+            waiter.event.wait()
+
+    def release(self, held_seconds: float = None):
+        """Return a slot, handing it straight to the next queued caller if any"""
+
+        with self._lock:
+            if held_seconds is not None:
+                self._avg_hold_seconds = 0.8 * self._avg_hold_seconds + 0.2 * held_seconds
+
+            while self._waiters:
+                waiter = heapq.heappop(self._waiters)
+                if waiter.cancelled:
+                    continue
+                self._queued -= 1
+                waiter.granted = True
+                waiter.wake()
+                return
+
+            self._active -= 1
+
+    def ensure_capacity(self):
+        """Fail fast if a new request would be rejected, before any work is done"""
+
+        with self._lock:
+            if self._active >= self.max_concurrent and self._queued >= self.max_queued:
+                self._rejected += 1
+                raise AdmissionRejected(self._retry_after())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": self._active,
+                "queued": self._queued,
+                "max_concurrent": self.max_concurrent,
+                "max_queued": self.max_queued,
+                "rejected": self._rejected,
+            }
+
+    def _admit(self, priority, **waiter_kwargs):
+        """Take a free slot (returns None) or enqueue a waiter (returns it)"""
+
+        with self._lock:
+            if self._active < self.max_concurrent:
+                self._active += 1
+                return None
+
+            waiter = _Waiter(priority, next(self._seq), **waiter_kwargs)
+            heapq.heappush(self._waiters, waiter)
+            self._queued += 1
+            return waiter
+
+    def _abandon(self, waiter: _Waiter):
+        with self._lock:
+            if not waiter.granted:
+                waiter.cancelled = True
+                self._queued -= 1
+                return
+
+        # The slot was handed over just as the caller gave up; pass it on
+        self.release()
+
+    def _retry_after(self) -> float:
+        backlog = self._queued + self._active
+        return max(1, math.ceil(self._avg_hold_seconds * backlog / self.max_concurrent))
+
+
+llm_admission = LLMAdmissionController(
+    max_concurrent=int(os.getenv("LLM_MAX_CONCURRENCY", 16)),
+    max_queued=int(os.getenv("LLM_MAX_QUEUE", 64)),
+)
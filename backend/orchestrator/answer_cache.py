@@ -0,0 +1,104 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional, Sequence
+import itertools
+import os
+import threading
+import time
+
+
+class SemanticAnswerCache:
+    """Retrieved context for recent educate queries, looked up by embedding similarity.
+
+    Entries are scoped (e.g. by matter type and jurisdiction) and only match
+    queries in the same scope whose cosine similarity clears the threshold.
+    Entries expire after ttl seconds and the least recently used are evicted
+    past max_entries. The whole cache is dropped when the collection version
+    changes, i.e. when the vector store has been re-ingested.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl: float = 3600.0, max_entries: int = 512,
+                 version_check_interval: float = 30.0):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_check_interval = version_check_interval
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._ids = itertools.count()
+
+        self._version = None
+        self._version_checked_at = float("-inf")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def sync_version(self, read_version: Callable[[], Hashable]):
+        """Invalidate if the collection version changed; read_version is called at most once per interval"""
+
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_interval:
+            return
+
+        version = read_version()
+        with self._lock:
+            self._version_checked_at = now
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._version_checked_at = float("-inf")
+
+    def lookup(self, embedding: Sequence[float], scope: Hashable) -> Optional[List[str]]:
+        """Chunks cached for the most similar query in scope, or None"""
+
+        import numpy as np
+
+        query = _normalise(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if now - entry["stored_at"] > self.ttl]:
+                del self._entries[key]
+
+            candidates = [(key, entry) for key, entry in self._entries.items() if entry["scope"] == scope]
+            if not candidates:
+                return None
+
+            similarities = np.stack([entry["embedding"] for _, entry in candidates]) @ query
+            best = int(similarities.argmax())
+            if similarities[best] < self.threshold:
+                return None
+
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+            return list(entry["context"])
+
+    def store(self, embedding: Sequence[float], scope: Hashable, context: Sequence[str]):
+        with self._lock:
+            self._entries[next(self._ids)] = {
+                "embedding": _normalise(embedding),
+                "scope": scope,
+                "context": tuple(context),
+                "stored_at": time.monotonic(),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def _normalise(embedding: Sequence[float]):
+    import numpy as np
+
+    vector = np.asarray(embedding, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+# Shared by every session; ANSWER_CACHE_MAX_ENTRIES=0 turns it off
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.92)),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 3600)),
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 512)),
+)
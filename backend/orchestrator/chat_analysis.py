@@ -1,80 +1,150 @@
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from .schemas import MessageIntent, FieldCompletenessTracker, CaseFactsSchema
+from langchain_core.messages import get_buffer_string
+from .schemas import CaseFactsPatch, UserEmotions
+from .admission import llm_admission
+from .metrics import track_stage
+from .completeness import compute_completeness
+from .fact_merge import merge_case_facts
+from .prompts import INTENT_PROMPT, INTENT_PARSER, FACTS_PROMPT, FACTS_PARSER, EMOTIONS_PROMPT, EMOTIONS_PARSER
+from .intent_classifier import intent_classifier, intent_text, log_llm_turn
+from .tracing import current_span
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
+import asyncio
+import contextvars
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Runs the emotions call beside fact extraction on the sync path
+_side_calls = ThreadPoolExecutor(max_workers=4, thread_name_prefix="analysis")
 
 class ConversationAnalyser:
     """Handles all analysis: intent, sentiment, completion"""
-    
+
     def __init__(self, llm):
         self.llm = llm
-        self.intent_parser = PydanticOutputParser(pydantic_object=MessageIntent)
-        self.completion_parser = PydanticOutputParser(pydantic_object=FieldCompletenessTracker)
-        self.state_parser = PydanticOutputParser(pydantic_object=CaseFactsSchema)
+
+        # Templates and parsers are compiled once per process in prompts.py
+        self.intent_chain = INTENT_PROMPT | llm | INTENT_PARSER
+        self.facts_chain = FACTS_PROMPT | llm | FACTS_PARSER
+        self.emotions_chain = EMOTIONS_PROMPT | llm | EMOTIONS_PARSER
+
+        # Answers intent on its own when confident; shared process-wide
+        self.local_intent = intent_classifier
+
     def analyse_intent(self, history) -> Tuple[str, str]:
         """Determine user intent and suggested response mode"""
-        
-        template = PromptTemplate(
-            template='''From the chat history, determine user's intent.
-            
-            Field explanations: 
-            * listen = default mode, should be prefered unless otherwise
-            * guide = Give questions if diverging intentions
-            * educate = Use RAG to give factual answer
-            
-            Format: {format}
-            CHAT HISTORY: {history}
-            ''',
-            input_variables=['history'],
-            partial_variables={"format": self.intent_parser.get_format_instructions()}
-        )
-        
-        chain = template | self.llm | self.intent_parser
-        result = chain.invoke({"history": history})
-        
+
+        text = intent_text(history)
+        result = self._local_intent(text)
+
+        if result is None:
+            with llm_admission.sync_slot(), track_stage("intent") as usage:
+                result = self.intent_chain.invoke({"history": get_buffer_string(history)}, config={"callbacks": [usage]})
+            log_llm_turn(text, result)
+
         return result.primary_intent, result.suggested_response_style
-    
-    def analyse_completion(self, history, curr_case_facts):
-        """Check if conversation is complete"""
-        
-        template = PromptTemplate(
-            template='''From chat history, fill out this schema 
-            
-            Format: {format}
-            Chat History: {history}
-            ''',
-            input_variables=['history'],
-            partial_variables={"format": self.state_parser.get_format_instructions()}
-        )
-        
-        chain = template | self.llm | self.state_parser
-    
-        case_facts = chain.invoke({"history": history })
-
-        print(case_facts)
-
-        for field, value in case_facts:
-            setattr(curr_case_facts, field, value)
-            
-        
-        template = PromptTemplate(
-            template='''From gathered case facts, determine if the chat should end
-            
-            Format: {format}
-            Chat Metrics: {data}
-            ''',
-            input_variables=['data'],
-            partial_variables={"format": self.completion_parser.get_format_instructions()}
+
+    async def aanalyse_intent(self, history) -> Tuple[str, str]:
+        """Async variant of analyse_intent"""
+
+        text = intent_text(history)
+        result = await self._alocal_intent(text)
+
+        if result is None:
+            async with llm_admission.slot():
+                with track_stage("intent") as usage:
+                    result = await self.intent_chain.ainvoke({"history": get_buffer_string(history)}, config={"callbacks": [usage]})
+            log_llm_turn(text, result)
+
+        return result.primary_intent, result.suggested_response_style
+
+    def _local_intent(self, text: str):
+        """Confident local classification, or None to fall back to the LLM"""
+
+        if not self.local_intent.available:
+            return None
+
+        try:
+            with track_stage("intent_local"):
+                result = self.local_intent.confident(text)
+                current_span().set_attribute("confident", result is not None)
+            return result
+        except Exception:
+            logger.warning("Local intent classifier failed; using the LLM", exc_info=True)
+            return None
+
+    async def _alocal_intent(self, text: str):
+        if not self.local_intent.available:
+            return None
+
+        try:
+            with track_stage("intent_local"):
+                result = await self.local_intent.aconfident(text)
+                current_span().set_attribute("confident", result is not None)
+            return result
+        except Exception:
+            logger.warning("Local intent classifier failed; using the LLM", exc_info=True)
+            return None
+
+    def analyse_completion(self, history, curr_case_facts, context=()):
+        """Check if conversation is complete.
+
+        history holds only the messages since the last extraction; the facts
+        they contain are merged into curr_case_facts, which is left unchanged.
+        Fact extraction and emotions run concurrently, as in the async variant.
+        """
+
+        # Copy the context so the emotions stage lands in this turn's trace
+        pending_emotions = _side_calls.submit(contextvars.copy_context().run, self._analyse_emotions, history)
+        patch = self._extract_facts(history, context)
+        emotions = pending_emotions.result()
+
+        logger.debug("Case facts patch: %s", patch)
+
+        case_facts = merge_case_facts(curr_case_facts, patch)
+
+        with track_stage("completion"):
+            completion = compute_completeness(case_facts, emotions.user_emotions)
+
+        logger.debug("Completion: %s", completion)
+
+        return completion, case_facts
+
+    async def aanalyse_completion(self, history, curr_case_facts, context=()):
+        """Async variant of analyse_completion; fact extraction and emotions run concurrently"""
+
+        patch, emotions = await asyncio.gather(
+            self._aextract_facts(history, context),
+            self._aanalyse_emotions(history),
         )
-        
-        chain = template | self.llm | self.completion_parser
-        completion = chain.invoke({"data": case_facts})
-        
-        print(completion)
-
-        return completion, case_facts 
-       
+
+        case_facts = merge_case_facts(curr_case_facts, patch)
+
+        with track_stage("completion"):
+            completion = compute_completeness(case_facts, emotions.user_emotions)
+
+        return completion, case_facts
+
+    def _extract_facts(self, history, context=()) -> CaseFactsPatch:
+        with llm_admission.sync_slot(), track_stage("fact_extraction") as usage:
+            return self.facts_chain.invoke({"history": get_buffer_string(history), "context": get_buffer_string(list(context))}, config={"callbacks": [usage]})
+
+    def _analyse_emotions(self, history) -> UserEmotions:
+        with llm_admission.sync_slot(), track_stage("emotions") as usage:
+            return self.emotions_chain.invoke({"history": get_buffer_string(history)}, config={"callbacks": [usage]})
+
+    async def _aextract_facts(self, history, context=()) -> CaseFactsPatch:
+        async with llm_admission.slot():
+            with track_stage("fact_extraction") as usage:
+                return await self.facts_chain.ainvoke({"history": get_buffer_string(history), "context": get_buffer_string(list(context))}, config={"callbacks": [usage]})
+
+    async def _aanalyse_emotions(self, history) -> UserEmotions:
+        async with llm_admission.slot():
+            with track_stage("emotions") as usage:
+                return await self.emotions_chain.ainvoke({"history": get_buffer_string(history)}, config={"callbacks": [usage]})
+
     def analyse_sentiment(self, text: str) -> dict:
         """Analyse emotional state"""
         # TODO: Implement when sentiment model ready
-        return {"emotion": "neutral", "intensity": 0.5}
\ No newline at end of file
+        return {"emotion": "neutral", "intensity": 0.5}
@@ -0,0 +1,125 @@
+from typing import Dict, List, Optional, Tuple
+import re
+
+from .schemas import CaseFactsSchema, FieldCompletenessTracker, necessary_fields
+
+
+# Fields required before an intake can be finalised, on top of necessary_fields
+MATTER_REQUIREMENTS: Dict[str, Tuple[str, ...]] = {
+    "family_law": ("children_involved", "domestic_violence_present", "property_assets", "current_legal_proceedings"),
+    "estate_dispute": ("property_assets", "estimated_claim_value", "statute_of_limitations_concern"),
+    "employment": ("client_employment_status", "incident_start_date", "statute_of_limitations_concern", "documentation_available"),
+    "property_dispute": ("property_assets", "estimated_claim_value", "documentation_available"),
+    "litigation": ("current_legal_proceedings", "represented_by_lawyer", "estimated_claim_value", "evidence_quality"),
+    "other": (),
+}
+
+# Bookkeeping fields that never count towards completeness
+_META_FIELDS = {"facts_last_updated", "confidence_score", "critical_gaps"}
+
+# Values the extractor uses when it has nothing real to record
+_PLACEHOLDERS = {"", "n/a", "na", "none", "null", "unknown", "not provided", "not specified", "not mentioned", "tbd", "?"}
+
+_HEDGES = re.compile(
+    r"\b(maybe|perhaps|possibly|probably|unsure|not sure|unclear|don'?t know|can'?t remember|i think|i guess)\b|\?",
+    re.IGNORECASE,
+)
+
+# Free-text fields quote the user, so hedging there doesn't make the field itself uncertain
+_NARRATIVE_FIELDS = {
+    "brief_description", "previous_legal_action", "risk_details", "desired_outcome", "deal_breakers",
+    "urgency_reason", "cultural_considerations", "disability_accessibility_needs", "additional_notes",
+}
+
+FIELD_ORDER: Tuple[str, ...] = tuple(name for name in CaseFactsSchema.model_fields if name not in _META_FIELDS)
+_FIELD_BITS = {name: 1 << index for index, name in enumerate(FIELD_ORDER)}
+
+
+def _mask(fields) -> int:
+    mask = 0
+    for name in fields:
+        mask |= _FIELD_BITS[name]
+    return mask
+
+
+def _fields(mask: int) -> List[str]:
+    return [name for name in FIELD_ORDER if mask & _FIELD_BITS[name]]
+
+
+# Requirement profiles as bitmasks, so each check is a handful of integer operations
+PROFILE_MASKS: Dict[Optional[str], int] = {None: _mask(necessary_fields)}
+for _matter_type, _extra in MATTER_REQUIREMENTS.items():
+    PROFILE_MASKS[_matter_type] = _mask(necessary_fields) | _mask(_extra)
+
+
+def _is_filled(value) -> bool:
+    if value is None:
+        return False
+    if isinstance(value, str):
+        return value.strip().lower() not in _PLACEHOLDERS
+    if isinstance(value, dict):
+        return any(_is_filled(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_is_filled(item) for item in value)
+    return True
+
+
+def _is_uncertain(value) -> bool:
+    if isinstance(value, str):
+        return bool(_HEDGES.search(value))
+    if isinstance(value, dict):
+        return any(_is_uncertain(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_is_uncertain(item) for item in value)
+    return False
+
+
+def field_masks(case_facts: CaseFactsSchema) -> Tuple[int, int]:
+    """Bitmasks over FIELD_ORDER of fields with a real value and of those hedged by the user"""
+
+    filled = uncertain = 0
+    for name in FIELD_ORDER:
+        value = getattr(case_facts, name)
+        if _is_filled(value):
+            bit = _FIELD_BITS[name]
+            filled |= bit
+            if name not in _NARRATIVE_FIELDS and _is_uncertain(value):
+                uncertain |= bit
+
+    # The extractor may flag gaps itself; treat those fields as uncertain
+    for name in case_facts.critical_gaps:
+        if name in _FIELD_BITS and filled & _FIELD_BITS[name]:
+            uncertain |= _FIELD_BITS[name]
+
+    return filled, uncertain
+
+
+def compute_completeness(case_facts: CaseFactsSchema, user_emotions: Optional[List[str]] = None) -> FieldCompletenessTracker:
+    """Completeness of the collected facts against the requirement profile for their matter type"""
+
+    required = PROFILE_MASKS.get(case_facts.matter_type, PROFILE_MASKS[None])
+    filled, uncertain = field_masks(case_facts)
+
+    filled_required = filled & required
+    uncertain_required = uncertain & required
+
+    filled_count = filled_required.bit_count()
+    total_count = required.bit_count()
+    ratio = filled_count / total_count if total_count else 1.0
+
+    if ratio >= 0.8 and not uncertain_required:
+        confidence = "high"
+    elif ratio >= 0.5:
+        confidence = "medium"
+    else:
+        confidence = "low"
+
+    return FieldCompletenessTracker(
+        fields_filled_count=filled_count,
+        fields_total_count=total_count,
+        completeness_ratio=round(ratio, 3),
+        confidence_level=confidence,
+        missing_critical_fields=_fields(required & ~filled),
+        uncertain_fields=_fields(uncertain_required),
+        user_emotions=user_emotions or [],
+    )
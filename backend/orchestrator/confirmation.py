@@ -0,0 +1,106 @@
+from typing import List
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+CONFIRMATION_QUESTION = (
+    "I believe I have enough information to draft a report of your situation. "
+    "Would you like to continue to discuss your case or move on to finalising your report?"
+)
+
+CONTINUE_LABEL = "continue discussing the case"
+FINALISE_LABEL = "finalise the report"
+
+
+class ConfirmationClassifier:
+    """Process-wide zero-shot classifier for the "continue vs. finalise" confirmation.
+
+    The model is loaded once, on first use or via warm(), and shared by every
+    session. Async callers are batched: requests arriving within max_wait_ms
+    of each other are classified in a single pipeline call on a worker thread.
+    """
+
+    def __init__(self, model: str = "valhalla/distilbart-mnli-12-1", max_batch_size: int = 16, max_wait_ms: float = 10):
+        self.model = model  # smaller than bart-large
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._pipeline = None
+        self._load_lock = threading.Lock()
+
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+    def _get_pipeline(self):
+        with self._load_lock:
+            if self._pipeline is None:
+                from transformers import pipeline
+
+                started = time.perf_counter()
+                self._pipeline = pipeline("zero-shot-classification", model=self.model, device=-1)
+                logger.info("Loaded %s in %.1fs", self.model, time.perf_counter() - started)
+            return self._pipeline
+
+    def warm(self):
+        """Load the model and run one inference so the first real request is fast"""
+
+        self.classify(["Let's finish the report"])
+
+    def classify(self, texts: List[str]) -> List[bool]:
+        """Return True for each text that asks to finalise the report"""
+
+        classifier = self._get_pipeline()
+        results = classifier(texts, candidate_labels=[CONTINUE_LABEL, FINALISE_LABEL], batch_size=len(texts))
+
+        if isinstance(results, dict):
+            results = [results]
+
+        return [result["labels"][0] == FINALISE_LABEL for result in results]
+
+    async def aclassify(self, text: str) -> bool:
+        """Classify one reply, batched with concurrent requests from other sessions"""
+
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run_batches(self._queue))
+
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run_batches(self, queue: asyncio.Queue):
+        while True:
+            batch = [await queue.get()]
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                results = await asyncio.to_thread(self.classify, texts)
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+confirmation_classifier = ConfirmationClassifier()
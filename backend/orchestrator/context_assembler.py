@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+from typing import List, Optional
+import logging
+
+from langchain_core.messages import AIMessage
+
+from .memory_manager import SUMMARY_PREFIX
+from .tokens import MESSAGE_OVERHEAD_TOKENS, TokenCounter
+
+logger = logging.getLogger(__name__)
+
+
+# Filled in this order; tokens a section leaves unused roll over to the next
+PRIORITY = ("recent", "case", "retrieved", "summary")
+
+DEFAULT_BUDGETS = {
+    "system": 1200,
+    "recent": 600,
+    "case": 80,
+    "retrieved": 500,
+    "summary": 250,
+}
+
+
+@dataclass
+class AssembledContext:
+    history: list
+    context: Optional[str]
+    missing: List[str]
+    tokens: dict
+
+
+class ContextAssembler:
+    """Fits a response prompt's variable parts into fixed token budgets.
+
+    The system prompt is fixed and only checked against its budget. The
+    rest are filled in PRIORITY order: the most recent messages (newest
+    first; the latest is always kept, truncated if need be), the case-fact
+    digest of missing fields, whole retrieved chunks in rank order (one
+    that does not fit is skipped, never cut), then the rolling summary,
+    truncated. Unused budget rolls over to later sections.
+    """
+
+    def __init__(self, counter: TokenCounter, system_prompt: str, budgets: Optional[dict] = None):
+        self.counter = counter
+        self.system_prompt = system_prompt
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self._system_checked = False
+
+    def _check_system_prompt(self):
+        if self._system_checked:
+            return
+
+        tokens = self.counter.count(self.system_prompt)
+        if tokens > self.budgets["system"]:
+            logger.warning("System prompt is %s tokens, over its %s token budget", tokens, self.budgets["system"])
+        self._system_checked = True
+
+    def assemble(self, messages: list, chunks: Optional[List[str]], missing: List[str]) -> AssembledContext:
+        self._check_system_prompt()
+
+        summary = None
+        if messages and messages[0].type == "ai" and str(messages[0].content).startswith(SUMMARY_PREFIX):
+            summary, messages = messages[0], messages[1:]
+
+        spare = 0
+        used = {}
+        fill = {
+            "recent": lambda budget: self._recent(messages, budget),
+            "case": lambda budget: self._listed(missing or [], budget),
+            "retrieved": lambda budget: self._chunks(chunks, budget),
+            "summary": lambda budget: self._summary(summary, budget),
+        }
+        parts = {}
+        for section in PRIORITY:
+            budget = self.budgets[section] + spare
+            parts[section], used[section] = fill[section](budget)
+            spare = max(budget - used[section], 0)
+
+        history = ([parts["summary"]] if parts["summary"] is not None else []) + parts["recent"]
+
+        return AssembledContext(history=history, context=parts["retrieved"], missing=parts["case"], tokens=used)
+
+    def _recent(self, messages: list, budget: int):
+        kept, used = [], 0
+        for message in reversed(messages):
+            tokens = self.counter.count_message(message)
+            if used + tokens > budget:
+                if not kept:
+                    content = self.counter.truncate(str(message.content), budget - MESSAGE_OVERHEAD_TOKENS)
+                    kept.append(message.model_copy(update={"content": content}))
+                    used = budget
+                break
+            kept.append(message)
+            used += tokens
+
+        return kept[::-1], used
+
+    def _listed(self, items: List[str], budget: int):
+        kept, used = [], 0
+        for item in items:
+            tokens = self.counter.count(item) + 1
+            if used + tokens > budget:
+                break
+            kept.append(item)
+            used += tokens
+
+        return kept, used
+
+    def _chunks(self, chunks: Optional[List[str]], budget: int):
+        if not chunks:
+            return None, 0
+
+        kept, used = [], 0
+        for chunk in chunks:
+            tokens = self.counter.count(chunk) + 1
+            if used + tokens > budget:
+                continue
+            kept.append(chunk)
+            used += tokens
+
+        return "\n\n".join(kept) or None, used
+
+    def _summary(self, summary, budget: int):
+        if summary is None:
+            return None, 0
+
+        tokens = self.counter.count_message(summary)
+        if tokens <= budget:
+            return summary, tokens
+
+        text = str(summary.content)[len(SUMMARY_PREFIX):-1]
+        text = self.counter.truncate(text, budget - MESSAGE_OVERHEAD_TOKENS - self.counter.count(SUMMARY_PREFIX) - 1)
+        if not text:
+            return None, 0
+        return AIMessage(content=f"{SUMMARY_PREFIX}{text}]"), budget
@@ -0,0 +1,59 @@
+from typing import get_origin
+import json
+
+from .schemas import CaseFactsSchema
+
+
+# List fields describing the current state rather than accumulating history
+_REPLACED_LISTS = {"critical_gaps"}
+
+LIST_FIELDS = frozenset(
+    name for name, field in CaseFactsSchema.model_fields.items()
+    if get_origin(field.annotation) is list
+)
+
+
+def _identity(item) -> str:
+    """Key used to spot the same list item restated in a later message"""
+
+    if isinstance(item, str):
+        return item.strip().lower()
+    if isinstance(item, dict):
+        item = {key: value.strip().lower() if isinstance(value, str) else value for key, value in item.items()}
+    return json.dumps(item, sort_keys=True, default=str)
+
+
+def merge_case_facts(current: CaseFactsSchema, patch) -> CaseFactsSchema:
+    """Merge a CaseFactsPatch into the facts collected so far.
+
+    Lists append new items, skipping ones already present; scalars are only
+    overwritten by non-null values, so facts from earlier messages survive
+    a patch that doesn't mention them.
+    """
+
+    updates = {}
+
+    for name, value in patch:
+        if value is None or name not in CaseFactsSchema.model_fields:
+            continue
+
+        if name in LIST_FIELDS and name not in _REPLACED_LISTS:
+            existing = list(getattr(current, name))
+            seen = {_identity(item) for item in existing}
+            for item in value:
+                key = _identity(item)
+                if key not in seen:
+                    seen.add(key)
+                    existing.append(item)
+            updates[name] = existing
+
+        elif isinstance(value, str) and not value.strip():
+            continue
+
+        else:
+            updates[name] = value
+
+    if not updates:
+        return current
+
+    return CaseFactsSchema.model_validate({**current.model_dump(), **updates})
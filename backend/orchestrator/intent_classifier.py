@@ -0,0 +1,159 @@
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from .schemas import MessageIntent
+from .tracing import RotatingJSONLWriter
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_ENCODER = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_HEADS_PATH = Path(__file__).parent / "models" / "intent_heads.npz"
+
+# Recent user messages the classifier (and the training log) look at
+CONTEXT_MESSAGES = 3
+
+
+def intent_text(history) -> str:
+    """Text classified for a turn: the last few user messages, oldest first"""
+
+    return "\n".join(str(getattr(msg, "content", msg)) for msg in list(history)[-CONTEXT_MESSAGES:])
+
+
+class SentenceEncoder:
+    """Mean-pooled, L2-normalised sentence embeddings from a small transformers model on CPU"""
+
+    def __init__(self, model: str = DEFAULT_ENCODER, max_length: int = 256):
+        self.model = model
+        self.max_length = max_length
+
+        self._tokenizer = None
+        self._encoder = None
+        self._load_lock = threading.Lock()
+
+    def _load(self):
+        with self._load_lock:
+            if self._encoder is None:
+                from transformers import AutoModel, AutoTokenizer
+
+                started = time.perf_counter()
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model)
+                self._encoder = AutoModel.from_pretrained(self.model).eval()
+                logger.info("Loaded %s in %.1fs", self.model, time.perf_counter() - started)
+            return self._tokenizer, self._encoder
+
+    def encode(self, texts: Sequence[str]):
+        """Array of shape (len(texts), hidden_size)"""
+
+        import torch
+
+        tokenizer, encoder = self._load()
+        batch = tokenizer(list(texts), padding=True, truncation=True, max_length=self.max_length, return_tensors="pt")
+
+        with torch.inference_mode():
+            hidden = encoder(**batch).last_hidden_state
+
+        mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        return torch.nn.functional.normalize(pooled, dim=-1).numpy()
+
+
+class LocalIntentClassifier:
+    """MessageIntent from sentence embeddings and linear heads, with a confidence score.
+
+    Heads are trained by benchmarks/train_intent_classifier.py on turns logged
+    from the LLM classifier and stored as a .npz file. Without that file the
+    classifier reports itself unavailable and every turn uses the LLM.
+    """
+
+    def __init__(self, heads_path=DEFAULT_HEADS_PATH, threshold: float = 0.8, encoder: Optional[SentenceEncoder] = None):
+        self.heads_path = Path(heads_path)
+        self.threshold = threshold
+        self._encoder = encoder
+
+        self._heads = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self._heads is not None or self.heads_path.exists()
+
+    def _get_heads(self) -> dict:
+        with self._load_lock:
+            if self._heads is None:
+                import numpy as np
+
+                with np.load(self.heads_path, allow_pickle=False) as data:
+                    self._heads = {name: data[name] for name in data.files}
+                if self._encoder is None:
+                    self._encoder = SentenceEncoder(str(self._heads["encoder"]))
+            return self._heads
+
+    def warm(self):
+        """Load the encoder and heads so the first turn is fast"""
+
+        if self.available:
+            self.predict(["I need help with my divorce"])
+
+    def predict(self, texts: Sequence[str]) -> List[Tuple[MessageIntent, float]]:
+        """Predicted intent and confidence (lowest top-class probability of the two label heads) per text"""
+
+        import numpy as np
+
+        heads = self._get_heads()
+        features = self._encoder.encode(texts)
+
+        def softmax(name):
+            logits = features @ heads[f"{name}_W"] + heads[f"{name}_b"]
+            logits -= logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            return probs / probs.sum(axis=1, keepdims=True)
+
+        intent_probs = softmax("primary_intent")
+        style_probs = softmax("suggested_response_style")
+        reassurance_probs = softmax("needs_reassurance")
+        intensity = np.clip(features @ heads["emotional_intensity_W"] + heads["emotional_intensity_b"], 0.0, 1.0)
+
+        results = []
+        for i in range(len(texts)):
+            intent = MessageIntent(
+                primary_intent=str(heads["primary_intent_labels"][intent_probs[i].argmax()]),
+                suggested_response_style=str(heads["suggested_response_style_labels"][style_probs[i].argmax()]),
+                needs_reassurance=bool(reassurance_probs[i].argmax()),
+                emotional_intensity=round(float(intensity[i]), 3),
+            )
+            results.append((intent, float(min(intent_probs[i].max(), style_probs[i].max()))))
+
+        return results
+
+    def confident(self, text: str) -> Optional[MessageIntent]:
+        """The local prediction if it clears the threshold, otherwise None (use the LLM)"""
+
+        intent, confidence = self.predict([text])[0]
+        return intent if confidence >= self.threshold else None
+
+    async def aconfident(self, text: str) -> Optional[MessageIntent]:
+        """Async variant of confident; inference runs on a worker thread"""
+
+        return await asyncio.to_thread(self.confident, text)
+
+
+intent_classifier = LocalIntentClassifier(
+    heads_path=os.getenv("INTENT_HEADS_PATH", DEFAULT_HEADS_PATH),
+    threshold=float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", 0.8)),
+)
+
+
+# Turns classified by the LLM, used as training data for the heads. Off unless
+# INTENT_LOG_PATH is set, since records contain user messages.
+turn_log = RotatingJSONLWriter(os.environ["INTENT_LOG_PATH"]) if os.getenv("INTENT_LOG_PATH") else None
+
+
+def log_llm_turn(text: str, intent: MessageIntent):
+    if turn_log is not None:
+        turn_log.write({"text": text, **intent.model_dump(), "logged_at": time.time()})
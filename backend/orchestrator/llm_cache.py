@@ -0,0 +1,124 @@
+from pathlib import Path
+from typing import Optional, Sequence
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from .metrics import metrics
+from .tracing import record_cache_hit
+
+logger = logging.getLogger(__name__)
+
+
+MODES = ("passthrough", "record", "replay")
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / "llm_cache"
+
+
+class LLMCacheMiss(LookupError):
+    """Raised in replay mode for a call that was never recorded"""
+
+
+class DiskLLMCache(BaseCache):
+    """Content-addressed LLM responses on local disk, for offline tests and benchmarks.
+
+    Each response is stored as JSON under the SHA-256 of the model's
+    parameters (LangChain's llm_string: model name, temperature, stop, ...)
+    and the serialised prompt messages. In record mode hits are served from
+    disk and misses go to the provider and are saved; in replay mode a miss
+    raises LLMCacheMiss instead of making a call.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, mode: str = "record"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"DiskLLMCache mode must be record or replay, got {mode!r}")
+
+        self.root = Path(root)
+        self.mode = mode
+
+    @staticmethod
+    def key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self.key(prompt, llm_string)
+
+        try:
+            with open(self._path(key), encoding="utf-8") as file:
+                record = json.load(file)
+        except FileNotFoundError:
+            metrics.cache_lookup("llm", False)
+            if self.mode == "replay":
+                raise LLMCacheMiss(
+                    f"No recorded LLM response for {key} under {self.root}; run once with LLM_CACHE_MODE=record"
+                ) from None
+            return None
+
+        metrics.cache_lookup("llm", True)
+        record_cache_hit("llm_cache")
+
+        return [
+            ChatGeneration(message=messages_from_dict([generation["message"]])[0],
+                           generation_info=generation["generation_info"])
+            for generation in record["generations"]
+        ]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        key = self.key(prompt, llm_string)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        record = {
+            "llm_string": llm_string,
+            "prompt": prompt,
+            "generations": [
+                {"message": message_to_dict(generation.message), "generation_info": generation.generation_info}
+                for generation in return_val
+            ],
+        }
+
+        # Written to a temporary file first so a concurrent reader never sees half a record
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, delete=False, suffix=".tmp") as file:
+            json.dump(record, file, indent=1)
+        os.replace(file.name, path)
+
+    def clear(self, **kwargs):
+        for path in self.root.glob("*/*.json"):
+            path.unlink()
+
+
+def configured_cache() -> Optional[DiskLLMCache]:
+    """Cache selected by LLM_CACHE_MODE (passthrough, record or replay) and LLM_CACHE_DIR"""
+
+    mode = os.getenv("LLM_CACHE_MODE", "passthrough").lower()
+    if mode not in MODES:
+        raise ValueError(f"LLM_CACHE_MODE must be one of {', '.join(MODES)}, got {mode!r}")
+    if mode == "passthrough":
+        return None
+
+    root = os.getenv("LLM_CACHE_DIR", DEFAULT_CACHE_DIR)
+    logger.info("LLM calls in %s mode, cache at %s", mode, root)
+    return DiskLLMCache(root, mode)
+
+
+llm_cache = configured_cache()
+
+
+def chat_model_kwargs() -> dict:
+    """Extra ChatOpenAI arguments that route every call through the configured cache.
+
+    Streaming is turned off while caching, since streamed calls bypass
+    LangChain's cache; streamed responses then arrive as one chunk.
+    """
+
+    if llm_cache is None:
+        return {}
+    return {"cache": llm_cache, "disable_streaming": True}
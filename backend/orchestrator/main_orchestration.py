@@ -3,116 +3,560 @@ from .memory_manager import MemoryManager
 from .response_generator import ResponseGenerator
 from .rag_handler import RAGHandler
 from .schemas import FieldCompletenessTracker, CaseFactsSchema
-from transformers import pipeline
+from .confirmation import CONFIRMATION_QUESTION, confirmation_classifier
+from .metrics import current_mode, current_session_id, track_stage
+from .tracing import current_span, record_cache_hit, span
 
+from contextlib import aclosing
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+CLOSING_MESSAGE = "Thank you for providing this information. A specialist will be in touch."
+
 
 class ChatOrchestrator:
     """Main orchestrator - coordinates components"""
-    
-    def __init__(self, llm, assistant_llm, embedder, system_prompt):
+
+    def __init__(self, llm, assistant_llm, embedder, system_prompt, session_id=None):
+        # Used to label metrics for this conversation
+        self.session_id = session_id
+
         # Core components
         self.analyser = ConversationAnalyser(llm)
         self.memory = MemoryManager(llm)
-        self.rag = RAGHandler(embedder)
+        self.rag = RAGHandler(embedder, scope=self._retrieval_scope)
         self.responder = ResponseGenerator(llm, system_prompt, self.rag)
 
 
-        
+
         # State
         self.completion_tracker = FieldCompletenessTracker()
-        self.case_facts = CaseFactsSchema() 
+        self.case_facts = CaseFactsSchema()
         self.complete = False
         self.message_count = 0
         self.message_limit = 50
-    
+
+        # "Continue vs. finalise" confirmation, asked as a normal chat turn
+        self.confirmation_due = False
+        self.awaiting_confirmation = False
+        self.confirmation_asked_at = None
+        self.confirmation_cooldown = 6
+
+        # Retrieve on every user message alongside intent classification
+        self.speculative_retrieval = True
+
+        # Per-turn latency records, e.g. time-to-first-token for streamed turns
+        self.turn_metrics = []
+
+        # Fact extraction / completion check for the previous turn, run off the response path
+        self._completion_task = None
+
+        # Index into total_history of the first message facts haven't been extracted from
+        self.facts_checkpoint = 0
+
+        # Version of the last persisted snapshot this instance reflects
+        self.snapshot_version = 0
+
     def orchestrate(self, user_input: str) -> str:
         """Main entry point - process user input and return response"""
-        
+
+        with span("orchestrate", session_id=self.session_id, message_count=self.message_count) as turn:
+            response = self._orchestrate(user_input)
+            turn.set_attribute("message_count", self.message_count)
+            turn.set_attribute("response_chars", len(response) if response else 0)
+            return response
+
+    def _orchestrate(self, user_input: str) -> str:
         if self.complete:
-            return "Thank you for providing this information. A specialist will be in touch."
-        
+            return CLOSING_MESSAGE
+
         if not user_input:
             return None
-        
+
+        self._bind_metric_labels()
+
+        if self.awaiting_confirmation and self._confirms(user_input):
+            return self._finalise(user_input)
+
         # 1. Save to memory
         self.memory.add_user_message(user_input)
         self.message_count += 1
-        
+
         # 2. Analyse intent and sentiment
         intent, mode = self.analyser.analyse_intent(
             self.memory.user_only_history.messages
         )
-        
+        current_mode.set(mode)
+        current_span().set_attribute("mode", mode)
+
         # 3. Generate response based on mode
-        response = self._generate_response(user_input, intent, mode)
-        
+        response = self._with_confirmation(self._generate_response(user_input, intent, mode))
+
         # 4. Save AI response
         if response:
             self.memory.add_ai_message(response)
-        
+
         # 5. Check completion
         self._check_completion()
-        
+
+        return response
+
+    async def aorchestrate(self, user_input: str) -> str:
+        """Async entry point - same pipeline as orchestrate without blocking the event loop.
+
+        Fact extraction and the completion check run as a background task after
+        the response is returned; the next turn waits for it only once it needs
+        the updated completion tracker.
+        """
+
+        with span("orchestrate", session_id=self.session_id, message_count=self.message_count) as turn:
+            response = await self._aorchestrate(user_input)
+            turn.set_attribute("message_count", self.message_count)
+            turn.set_attribute("response_chars", len(response) if response else 0)
+            return response
+
+    async def _aorchestrate(self, user_input: str) -> str:
+        if self.complete:
+            return CLOSING_MESSAGE
+
+        if not user_input:
+            return None
+
+        self._bind_metric_labels()
+
+        if self.awaiting_confirmation and await self._aconfirms(user_input):
+            return self._finalise(user_input)
+
+        started = time.perf_counter()
+
+        self.memory.add_user_message(user_input)
+        self.message_count += 1
+
+        intent, mode, history, context, stages = await self._aprepare_turn(user_input)
+        if self.complete:
+            return CLOSING_MESSAGE
+
+        response = await self._timed(
+            stages, "response", self._agenerate_response(user_input, intent, mode, history, context)
+        )
+        response = self._with_confirmation(response)
+
+        if response:
+            self.memory.add_ai_message(response)
+
+        self._record_turn(mode, started, stages=stages)
+        self._schedule_completion_check()
+        self.memory.schedule_summary()
+
         return response
-    
+
+    async def astream_orchestrate(self, user_input: str):
+        """Streaming entry point - yields response tokens as they are produced.
+
+        As with aorchestrate, fact extraction runs in the background once the
+        response has been produced.
+        """
+
+        with span("orchestrate", session_id=self.session_id, message_count=self.message_count, streaming=True) as turn:
+            response_chars = 0
+            try:
+                # Closed explicitly so a client disconnect still runs the inner finally
+                async with aclosing(self._astream_orchestrate(user_input)) as stream:
+                    async for token in stream:
+                        response_chars += len(token)
+                        yield token
+            finally:
+                turn.set_attribute("message_count", self.message_count)
+                turn.set_attribute("response_chars", response_chars)
+
+    async def _astream_orchestrate(self, user_input: str):
+        if self.complete:
+            yield CLOSING_MESSAGE
+            return
+
+        if not user_input:
+            return
+
+        self._bind_metric_labels()
+
+        if self.awaiting_confirmation and await self._aconfirms(user_input):
+            yield self._finalise(user_input)
+            return
+
+        started = time.perf_counter()
+        first_token_at = None
+        tokens = []
+
+        self.memory.add_user_message(user_input)
+        self.message_count += 1
+
+        intent, mode, history, context, stages = await self._aprepare_turn(user_input)
+        if self.complete:
+            yield CLOSING_MESSAGE
+            return
+
+        response_started = time.perf_counter()
+        try:
+            async for token in self._astream_response(user_input, intent, mode, history, context):
+                if not token:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                tokens.append(token)
+                yield token
+
+            question = self._with_confirmation("")
+            if question:
+                tokens.append(question)
+                yield question
+        finally:
+            # Keep whatever was produced, even if the client disconnected mid-stream
+            response = "".join(tokens)
+            if response:
+                self.memory.add_ai_message(response)
+
+            stages["response"] = (time.perf_counter() - response_started) * 1000
+            turn_span = current_span()
+            if first_token_at is not None and turn_span is not None:
+                turn_span.set_attribute("ttft_ms", round((first_token_at - started) * 1000, 1))
+            self._record_turn(mode, started, first_token_at, stages)
+            self._schedule_completion_check()
+            self.memory.schedule_summary()
+
+    async def _aprepare_turn(self, user_input: str):
+        """Run the stages that don't depend on each other concurrently.
+
+        Intent classification, reading short-term history and a speculative
+        retrieval on the user message run side by side, while the
+        previous turn's background completion check (which the response needs)
+        finishes. The retrieval runs as its own task: educate turns wait for
+        it, any other mode cancels it rather than waiting on a result it won't use.
+        """
+
+        stages = {}
+
+        retrieval_started = time.perf_counter()
+        retrieval = asyncio.create_task(self._aspeculative_retrieve(user_input))
+
+        try:
+            (intent, mode), history, _ = await asyncio.gather(
+                self._timed(stages, "intent", self.analyser.aanalyse_intent(
+                    self.memory.user_only_history.messages
+                )),
+                self._timed(stages, "history", self.memory.aget_short_term_history()),
+                self._timed(stages, "background_wait", self._await_completion_check()),
+            )
+        except BaseException:
+            retrieval.cancel()
+            raise
+
+        current_mode.set(mode)
+        current_span().set_attribute("mode", mode)
+
+        context = None
+        if mode != "educate":
+            retrieval.cancel()
+        else:
+            fetched = await retrieval
+            stages["retrieval"] = (time.perf_counter() - retrieval_started) * 1000
+            if fetched is not None:
+                # The speculative retrieval is reused instead of retrieving again
+                context = self.rag.use(fetched)
+                record_cache_hit("speculative_retrieval")
+
+        return intent, mode, history, context, stages
+
+    async def _aspeculative_retrieve(self, user_input: str):
+        """Retrieve context ahead of knowing the mode; failures fall back to retrieval in educate"""
+
+        if not self.speculative_retrieval:
+            return None
+
+        try:
+            return await self.rag.afetch(user_input)
+        except Exception:
+            logger.warning("Speculative retrieval failed", exc_info=True)
+            return None
+
+    def _retrieval_scope(self):
+        """Cached retrieval results are only shared between cases of the same matter type and jurisdiction"""
+
+        return self.case_facts.matter_type, self.case_facts.state_territory
+
+    def _bind_metric_labels(self):
+        """Label every stage recorded from here on with this session; the mode is set once known"""
+
+        current_session_id.set(self.session_id)
+        current_mode.set("")
+
+    @staticmethod
+    async def _timed(stages: dict, name: str, awaitable):
+        """Await and record the elapsed milliseconds under stages[name]"""
+
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            stages[name] = (time.perf_counter() - started) * 1000
+
+    def _confirms(self, user_input: str) -> bool:
+        """Whether the reply to the confirmation question asks to finalise.
+
+        If the classifier fails the reply is handled as a normal turn rather
+        than lost; the pending question is cleared once there is an answer.
+        """
+
+        try:
+            with track_stage("confirmation"):
+                finalise = confirmation_classifier.classify([user_input])[0]
+        except Exception:
+            logger.warning("Confirmation classifier failed; handling the reply as a normal turn", exc_info=True)
+            finalise = False
+
+        self.awaiting_confirmation = False
+        return finalise
+
+    async def _aconfirms(self, user_input: str) -> bool:
+        """Async variant of _confirms"""
+
+        try:
+            with track_stage("confirmation"):
+                finalise = await confirmation_classifier.aclassify(user_input)
+        except Exception:
+            logger.warning("Confirmation classifier failed; handling the reply as a normal turn", exc_info=True)
+            finalise = False
+
+        self.awaiting_confirmation = False
+        return finalise
+
+    def _finalise(self, user_input: str) -> str:
+        """Close the intake after the user confirmed they want to finalise"""
+
+        self.memory.add_user_message(user_input)
+        self.message_count += 1
+        self.memory.add_ai_message(CLOSING_MESSAGE)
+        self.complete = True
+
+        return CLOSING_MESSAGE
+
+    def _with_confirmation(self, response: str) -> str:
+        """Append the confirmation question to the reply if the last completion check asked for it"""
+
+        if not self.confirmation_due:
+            return response
+
+        self.confirmation_due = False
+        self.awaiting_confirmation = True
+        self.confirmation_asked_at = self.message_count
+
+        return f"{response}\n\n{CONFIRMATION_QUESTION}" if response else f"\n\n{CONFIRMATION_QUESTION}"
+
+    async def await_background(self):
+        """Wait for all background work: the completion check and any history summary"""
+
+        await self._await_completion_check()
+        await self.memory.await_summary()
+
+    async def _await_completion_check(self):
+        """Wait for the pending fact extraction / completion check, if any"""
+
+        task = self._completion_task
+        if task is None:
+            return
+
+        try:
+            # Shielded so a cancelled request doesn't abort the update for the session
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Already logged by the task callback; carry on with the previous tracker
+            pass
+        finally:
+            if self._completion_task is task and task.done():
+                self._completion_task = None
+
+    def _schedule_completion_check(self):
+        """Start fact extraction and the completion check without blocking the reply"""
+
+        self._completion_task = asyncio.create_task(self._acheck_completion())
+        self._completion_task.add_done_callback(self._log_completion_failure)
+
+    def _log_completion_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background completion check failed", exc_info=task.exception())
+
+    def snapshot(self, include_memory: bool = True) -> dict:
+        """Serialisable conversation state (clients and components are rebuilt on restore)"""
+
+        snapshot = {
+            "case_facts": self.case_facts.model_dump(mode="json", exclude_defaults=True),
+            "completion_tracker": self.completion_tracker.model_dump(mode="json", exclude_defaults=True),
+            "message_count": self.message_count,
+            "complete": self.complete,
+            "confirmation_due": self.confirmation_due,
+            "awaiting_confirmation": self.awaiting_confirmation,
+            "confirmation_asked_at": self.confirmation_asked_at,
+            "facts_checkpoint": self.facts_checkpoint,
+        }
+        if include_memory:
+            snapshot["memory"] = self.memory.snapshot()
+        return snapshot
+
+    def restore(self, snapshot: dict):
+        """Load conversation state produced by snapshot()"""
+
+        self.memory.restore(snapshot["memory"])
+        self.case_facts = CaseFactsSchema.model_validate(snapshot.get("case_facts", {}))
+        self.completion_tracker = FieldCompletenessTracker.model_validate(snapshot.get("completion_tracker", {}))
+        self.message_count = snapshot.get("message_count", 0)
+        self.complete = snapshot.get("complete", False)
+        self.confirmation_due = snapshot.get("confirmation_due", False)
+        self.awaiting_confirmation = snapshot.get("awaiting_confirmation", False)
+        self.confirmation_asked_at = snapshot.get("confirmation_asked_at")
+        self.facts_checkpoint = snapshot.get("facts_checkpoint", 0)
+
+    def approx_size_bytes(self) -> int:
+        """Approximate bytes held by this session's state (clients are shared and not counted)"""
+
+        return (
+            self.memory.approx_size_bytes()
+            + len(self.case_facts.model_dump_json())
+            + len(self.completion_tracker.model_dump_json())
+        )
+
+    def _record_turn(self, mode: str, started: float, first_token_at=None, stages=None):
+        """Store latency figures for the turn that just finished"""
+
+        finished = time.perf_counter()
+        ttft_ms = None if first_token_at is None else (first_token_at - started) * 1000
+        stages = {name: round(ms, 1) for name, ms in (stages or {}).items()}
+
+        self.turn_metrics.append({
+            "turn": self.message_count,
+            "mode": mode,
+            "ttft_ms": ttft_ms,
+            "total_ms": (finished - started) * 1000,
+            "stages_ms": stages,
+        })
+
+        logger.info("Turn %s (%s): ttft=%s ms, stages=%s", self.message_count, mode,
+                    "n/a" if ttft_ms is None else f"{ttft_ms:.0f}", stages)
+
     def _generate_response(self, user_input: str, intent: str, mode: str) -> str:
         """Route to appropriate response generator"""
-        
+
         print("Running command for", mode)
 
         history = self.memory.get_short_term_history()
-        
+
         if mode == "listen":
             return self.responder.listen(user_input=user_input, intent=intent, history=history, completion_tracker=self.completion_tracker)
-        
+
         elif mode == "educate":
             return self.responder.educate(user_input=user_input, history=history, intent=intent, completion_tracker=self.completion_tracker)
-        
+
         elif mode == "guide":
             return self.responder.guide(
-                user_input=user_input, 
-                intent=intent, 
-                completion_tracker=self.completion_tracker, 
+                user_input=user_input,
+                intent=intent,
+                completion_tracker=self.completion_tracker,
                 history=history
             )
-    
-        
+
+
         else:
-            return self.responder.listen(user_input, intent, history)
-    
+            return self.responder.listen(user_input, intent, history, self.completion_tracker)
+
+    async def _agenerate_response(self, user_input: str, intent: str, mode: str, history, context=None) -> str:
+        """Async variant of _generate_response"""
+
+        logger.debug("Running command for %s", mode)
+
+        if mode == "educate":
+            return await self.responder.aeducate(user_input=user_input, history=history, intent=intent, completion_tracker=self.completion_tracker, context=context)
+
+        elif mode == "guide":
+            return await self.responder.aguide(
+                user_input=user_input,
+                intent=intent,
+                completion_tracker=self.completion_tracker,
+                history=history
+            )
+
+        return await self.responder.alisten(user_input=user_input, intent=intent, history=history, completion_tracker=self.completion_tracker)
+
+    async def _astream_response(self, user_input: str, intent: str, mode: str, history, context=None):
+        """Streaming variant of _agenerate_response"""
+
+        if mode == "educate":
+            stream = self.responder.astream_educate(user_input=user_input, history=history, intent=intent, completion_tracker=self.completion_tracker, context=context)
+
+        elif mode == "guide":
+            # Guide questions are parsed from structured output, so they arrive in one piece
+            yield await self.responder.aguide(
+                user_input=user_input,
+                intent=intent,
+                completion_tracker=self.completion_tracker,
+                history=history
+            )
+            return
+
+        else:
+            stream = self.responder.astream_listen(user_input=user_input, intent=intent, history=history, completion_tracker=self.completion_tracker)
+
+        async for token in stream:
+            yield token
+
     def _check_completion(self):
         """Check if conversation should end"""
-        
+
+        context, new_messages, end = self._unextracted_messages()
+
         self.completion_tracker, self.case_facts = self.analyser.analyse_completion(
-            self.memory.short_term_memory.messages, self.case_facts
+            new_messages, self.case_facts, context
         )
-        
-        # Exit conditions
-        if len(self.completion_tracker.missing_critical_fields) == 0 and len(self.completion_tracker.missing_critical_fields) <= 2:
-            classifier = pipeline("zero-shot-classification",
-                      model="valhalla/distilbart-mnli-12-1")  # smaller than bart-large
+        self.facts_checkpoint = end
+
+        self._apply_exit_conditions()
+
+    async def _acheck_completion(self):
+        """Async variant of _check_completion"""
 
-            ai_message = """I believe I have enough information to draft a report of your situation.
-            Would you like to continue to discuss your case or move on to finalising your report?"""
+        context, new_messages, end = self._unextracted_messages()
+
+        self.completion_tracker, self.case_facts = await self.analyser.aanalyse_completion(
+            new_messages, self.case_facts, context
+        )
+        self.facts_checkpoint = end
 
-            print(ai_message)
-            user_input = input("User Input: ")
+        self._apply_exit_conditions()
 
-            labels = ["false", "true"]
-            result = classifier(user_input, candidate_labels=labels)
+    def _unextracted_messages(self):
+        """Messages since the last extraction, plus the one before them as context"""
 
-            print(result)
+        messages = self.memory.total_history.messages
+        end = len(messages)
+        start = min(self.facts_checkpoint, end)
 
-            if result == "true":
-                self.complete = True
-            else:
-                self.complete = False 
+        # The checkpoint only advances once extraction succeeds, so failed turns are retried
+        return messages[max(start - 1, 0):start], messages[start:end], end
+
+    def _apply_exit_conditions(self):
+        """Decide whether the conversation is complete from the current tracker"""
+
+        # Exit conditions
+        recently_asked = (
+            self.confirmation_asked_at is not None
+            and self.message_count - self.confirmation_asked_at < self.confirmation_cooldown
+        )
 
+        if len(self.completion_tracker.missing_critical_fields) == 0 and not (self.awaiting_confirmation or recently_asked):
+            # Asked on the next reply; the user's answer is classified as its own turn
+            self.confirmation_due = True
 
-        
         if self.message_count >= self.message_limit:
-            self.complete = True
\ No newline at end of file
+            self.complete = True
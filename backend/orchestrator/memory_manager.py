@@ -1,15 +1,51 @@
 from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.messages import AIMessage, get_buffer_string, messages_from_dict
+from .admission import llm_admission
+from .metrics import track_stage
+from .prompts import SUMMARY_PROMPT
+from .tokens import token_counter
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rough per-message cost of the BaseMessage object itself, excluding content
+MESSAGE_OVERHEAD_BYTES = 600
+
+SUMMARY_PREFIX = "[Summary of previous conversation: "
+
 
 class MemoryManager:
-    """Manages all conversation memory"""
+    """Manages all conversation memory
+
+    short_term_memory is what responses see: a rolling summary message
+    followed by the most recent messages verbatim. Once the recent messages
+    pass summarise_at_tokens, the oldest are folded into the summary until
+    about keep_recent_tokens (and at least min_recent_messages) remain.
+    Tokens are counted with the same cached counter the response prompt is
+    budgeted with. In async sessions the fold runs in the background after
+    a turn, so reading short-term history never waits on the LLM.
+    """
     
-    def __init__(self, llm, condense_threshold=3):
+    def __init__(self, llm, summarise_at_tokens=600, keep_recent_tokens=250, min_recent_messages=4, counter=None):
         self.llm = llm
-        self.condense_threshold = condense_threshold
+        self.counter = counter or token_counter(getattr(llm, "model_name", None))
+        self.summarise_at_tokens = summarise_at_tokens
+        self.keep_recent_tokens = keep_recent_tokens
+        self.min_recent_messages = min_recent_messages
         
         self.total_history = InMemoryChatMessageHistory()
         self.short_term_memory = InMemoryChatMessageHistory()
         self.user_only_history = InMemoryChatMessageHistory()
+
+        # Bumped whenever short_term_memory is rebuilt rather than appended to
+        self.short_term_epoch = 0
+
+        # Background fold of aged-out messages into the summary, if one is running
+        self._summary_task = None
+
+    # Histories persisted in snapshots, by attribute name
+    HISTORY_NAMES = ("total_history", "short_term_memory", "user_only_history")
     
     def add_user_message(self, message: str):
         """Add user message to all relevant histories"""
@@ -22,107 +58,162 @@ class MemoryManager:
         self.total_history.add_ai_message(message)
         self.short_term_memory.add_ai_message(message)
     
+    def approx_size_bytes(self) -> int:
+        """Approximate memory held by all histories"""
+
+        total = 0
+        for history in (self.total_history, self.short_term_memory, self.user_only_history):
+            for msg in history.messages:
+                total += MESSAGE_OVERHEAD_BYTES + len(str(msg.content).encode())
+        return total
+
+    def snapshot(self) -> dict:
+        """Compact, JSON-serialisable copy of every history"""
+
+        snapshot = {
+            name: [encode_message(msg) for msg in getattr(self, name).messages]
+            for name in self.HISTORY_NAMES
+        }
+        snapshot["short_term_epoch"] = self.short_term_epoch
+        return snapshot
+
+    def restore(self, snapshot: dict):
+        """Replace all histories with the contents of a snapshot"""
+
+        for name in self.HISTORY_NAMES:
+            history = InMemoryChatMessageHistory()
+            history.messages.extend(decode_messages(snapshot.get(name, [])))
+            setattr(self, name, history)
+
+        self.short_term_epoch = snapshot.get("short_term_epoch", 0)
+
+    @property
+    def summary(self) -> str:
+        """Rolling summary of the messages no longer kept verbatim"""
+
+        messages = self.short_term_memory.messages
+        if messages and messages[0].type == "ai" and str(messages[0].content).startswith(SUMMARY_PREFIX):
+            return str(messages[0].content)[len(SUMMARY_PREFIX):-1]
+        return ""
+
+    def _recent_messages(self) -> list:
+        """Short-term messages after the summary"""
+
+        messages = self.short_term_memory.messages
+        return messages[1:] if self.summary else messages
+
+    def _aged_out(self) -> int:
+        """How many of the oldest recent messages to fold into the summary, 0 if under threshold"""
+
+        recent = self._recent_messages()
+        tokens = [self.counter.count_message(msg) for msg in recent]
+        remaining = sum(tokens)
+        if remaining <= self.summarise_at_tokens:
+            return 0
+
+        count = 0
+        while remaining > self.keep_recent_tokens and len(recent) - count > self.min_recent_messages:
+            remaining -= tokens[count]
+            count += 1
+        return count
+
     def get_short_term_history(self):
-        """Get short-term history, condensing if needed"""
+        """Get short-term history, folding aged-out messages into the summary first if needed"""
         
-        if len(self.short_term_memory.messages) > self.condense_threshold:
-            condensed = self._condense_history()
-            return condensed
+        count = self._aged_out()
+        if count:
+            self._fold(count)
         
         return self.short_term_memory
-    
-    def _condense_history(self):
-        """Condense history to reduce tokens"""
-
-        essential_fields = [
-                # Matter Identification
-                "matter_type",
-                "matter_subtype",
-                "brief_description",
-                
-                # Parties
-                "client_name",
-                "other_parties",
-                "children_involved",
-                "children_details",
-                
-                # Timeline
-                "incident_start_date",
-                "key_events",
-                "upcoming_deadlines",
-                "statute_of_limitations_concern",
-                
-                # Legal Status
-                "current_legal_proceedings",
-                "court_orders_in_place",
-                "previous_legal_action",
-                "represented_by_lawyer",
-                
-                # Financial
-                "estimated_claim_value",
-                "property_assets",
-                "financial_accounts",
-                "debts_liabilities",
-                "client_employment_status",
-                "client_annual_income",
-                "ability_to_pay_legal_fees",
-                
-                # Risk Factors
-                "domestic_violence_present",
-                "immediate_safety_risk",
-                "risk_of_asset_dissipation",
-                "mental_health_concerns",
-                "substance_abuse_issues",
-                "risk_details",
-                
-                # Evidence
-                "documentation_available",
-                "witnesses_available",
-                "evidence_quality",
-                
-                # Client Goals
-                "desired_outcome",
-                "primary_concerns",
-                "deal_breakers",
-                "willingness_to_negotiate",
-                
-                # Jurisdiction
-                "state_territory",
-                "matter_location",
-                "interstate_elements",
-                
-                # Urgency
-                "urgency_level",
-                "urgency_reason",
-                
-                # Additional Context
-                "cultural_considerations",
-                "disability_accessibility_needs",
-                "preferred_contact_method",
-                "additional_notes",
-                
-                # Meta
-                "facts_last_updated",
-                "confidence_score",
-                "critical_gaps"
-            ]
-        
-        condensed_text = self.llm.invoke(f"""
-        Condense this message history. 
-        Keep all facts relating to the following {essential_fields}
-        
-        Message History: {self.short_term_memory.messages}
-        """)
-        
+
+    async def aget_short_term_history(self):
+        """Short-term history as it stands; folding happens in the background (see schedule_summary)"""
+
+        self.schedule_summary()
+        return self.short_term_memory
+
+    def schedule_summary(self):
+        """Start folding aged-out messages into the summary in the background, if due"""
+
+        if self._summary_task is not None and not self._summary_task.done():
+            return
+
+        count = self._aged_out()
+        if count:
+            self._summary_task = asyncio.create_task(self._afold(count))
+            self._summary_task.add_done_callback(self._log_summary_failure)
+
+    async def await_summary(self):
+        """Wait for a pending background fold, if any"""
+
+        task = self._summary_task
+        if task is None:
+            return
+
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Already logged; the next turn retries with the current summary
+            pass
+
+    def _log_summary_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background history summary failed", exc_info=task.exception())
+
+    def _fold(self, count: int):
+        """Fold the oldest count recent messages into the summary"""
+
+        epoch = self.short_term_epoch
+        with llm_admission.sync_slot(), track_stage("condense_history") as usage:
+            summary = self.llm.invoke(self._summary_prompt(count), config={"callbacks": [usage]})
+
+        self._apply_summary(summary.content, count, epoch)
+
+    async def _afold(self, count: int):
+        """Async variant of _fold"""
+
+        epoch = self.short_term_epoch
+        async with llm_admission.slot():
+            with track_stage("condense_history") as usage:
+                summary = await self.llm.ainvoke(self._summary_prompt(count), config={"callbacks": [usage]})
+
+        self._apply_summary(summary.content, count, epoch)
+
+    def _summary_prompt(self, count: int) -> list:
+        """Prompt merging the oldest count recent messages into the current summary"""
+
+        return SUMMARY_PROMPT.format_messages(
+            summary=self.summary or "(none yet)",
+            history=get_buffer_string(self._recent_messages()[:count]),
+        )
+
+    def _apply_summary(self, summary: str, count: int, epoch: int):
+        """Swap short-term memory for the new summary plus the messages that weren't folded"""
+
+        if epoch != self.short_term_epoch:
+            # Short-term memory was replaced (e.g. restored) while summarising
+            return
+
         new_history = InMemoryChatMessageHistory()
-        new_history.add_ai_message(f"[Summary of previous conversation: {condensed_text.content}]")
-        
-        # Keep last 3 messages uncondesed
-        for msg in self.short_term_memory.messages[-3:]:
-            new_history.messages.append(msg)
-        
+        new_history.messages.append(AIMessage(content=f"{SUMMARY_PREFIX}{summary}]"))
+
+        # Messages added while the summary was being written are kept too
+        new_history.messages.extend(self._recent_messages()[count:])
+
         self.short_term_memory = new_history
+        self.short_term_epoch += 1
+
+
+def encode_message(msg) -> list:
+    """Encode a chat message as a compact [type, content] pair"""
+    return [msg.type, msg.content]
 
-        print(new_history)
 
-        return new_history
\ No newline at end of file
+def decode_messages(encoded: list) -> list:
+    """Inverse of encode_message for a list of pairs"""
+    return messages_from_dict([
+        {"type": msg_type, "data": {"content": content}}
+        for msg_type, content in encoded
+    ])
@@ -0,0 +1,236 @@
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+import bisect
+import os
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .tracing import span
+
+
+# Labels picked up by every stage recorded in the current turn
+current_session_id: ContextVar[Optional[str]] = ContextVar("current_session_id", default=None)
+current_mode: ContextVar[str] = ContextVar("current_mode", default="")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+
+# USD per million tokens, defaults are gpt-4o-mini list prices
+PROMPT_COST_PER_MILLION = float(os.getenv("LLM_PROMPT_COST_PER_MILLION", 0.15))
+COMPLETION_COST_PER_MILLION = float(os.getenv("LLM_COMPLETION_COST_PER_MILLION", 0.60))
+
+
+class UsageCallback(BaseCallbackHandler):
+    """Collects token usage from the LLM runs it is attached to"""
+
+    run_inline = True
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_calls = 0
+        self.prompt_chars = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.prompt_chars += sum(len(str(message.content)) for batch in messages for message in batch)
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.prompt_chars += sum(len(prompt) for prompt in prompts)
+
+    def on_llm_end(self, response, **kwargs):
+        self.llm_calls += 1
+
+        found = False
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.prompt_tokens += usage.get("input_tokens", 0)
+                    self.completion_tokens += usage.get("output_tokens", 0)
+                    found = True
+
+        if not found and response.llm_output:
+            usage = response.llm_output.get("token_usage") or {}
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+
+    @property
+    def cost_usd(self) -> float:
+        return (self.prompt_tokens * PROMPT_COST_PER_MILLION
+                + self.completion_tokens * COMPLETION_COST_PER_MILLION) / 1_000_000
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Per-stage latency, call and token metrics with Prometheus text exposition.
+
+    Everything is labelled by stage and mode (listen/educate/guide). Totals are
+    also kept per session, bounded to the max_sessions most recently active;
+    they outlive in-memory eviction so a restored session keeps its totals.
+    """
+
+    def __init__(self, max_sessions: int = 10000):
+        self.max_sessions = max_sessions
+
+        self._lock = threading.Lock()
+        self._latency = defaultdict(_Histogram)
+        self._calls = defaultdict(int)
+        self._llm_calls = defaultdict(int)
+        self._prompt_tokens = defaultdict(int)
+        self._completion_tokens = defaultdict(int)
+        self._cost_usd = defaultdict(float)
+        self._sessions: OrderedDict = OrderedDict()
+        self._cache_lookups = defaultdict(int)
+        self._gauges = []
+
+    def observe(self, stage: str, seconds: float, usage: Optional[UsageCallback] = None,
+                mode: Optional[str] = None, session_id: Optional[str] = None):
+        """Record one completed stage"""
+
+        mode = current_mode.get() if mode is None else mode
+        session_id = current_session_id.get() if session_id is None else session_id
+        key = (stage, mode)
+
+        prompt_tokens = usage.prompt_tokens if usage else 0
+        completion_tokens = usage.completion_tokens if usage else 0
+        llm_calls = usage.llm_calls if usage else 0
+        cost_usd = usage.cost_usd if usage else 0.0
+
+        with self._lock:
+            self._latency[key].observe(seconds)
+            self._calls[key] += 1
+            self._llm_calls[key] += llm_calls
+            self._prompt_tokens[key] += prompt_tokens
+            self._completion_tokens[key] += completion_tokens
+            self._cost_usd[key] += cost_usd
+
+            if session_id is not None:
+                totals = self._sessions.get(session_id)
+                if totals is None:
+                    totals = self._sessions[session_id] = {
+                        "calls": 0, "llm_calls": 0, "prompt_tokens": 0,
+                        "completion_tokens": 0, "cost_usd": 0.0, "latency_seconds": 0.0, "stages": {},
+                    }
+                self._sessions.move_to_end(session_id)
+
+                totals["calls"] += 1
+                totals["llm_calls"] += llm_calls
+                totals["prompt_tokens"] += prompt_tokens
+                totals["completion_tokens"] += completion_tokens
+                totals["cost_usd"] += cost_usd
+                totals["latency_seconds"] += seconds
+                totals["stages"][stage] = totals["stages"].get(stage, 0) + 1
+
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+
+    def cache_lookup(self, cache: str, hit: bool):
+        """Count a lookup in one of the response-path caches; hit rate is hits / all lookups"""
+
+        with self._lock:
+            self._cache_lookups[(cache, "hit" if hit else "miss")] += 1
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        """Register a gauge whose value is read at scrape time"""
+
+        self._gauges.append((name, help_text, read))
+
+    def session_totals(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            totals = self._sessions.get(session_id)
+            return None if totals is None else {**totals, "stages": dict(totals["stages"])}
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+
+        lines = []
+
+        with self._lock:
+            counters = (
+                ("equaliser_stage_calls_total", "Completed pipeline stages", self._calls),
+                ("equaliser_llm_calls_total", "LLM calls made", self._llm_calls),
+                ("equaliser_llm_prompt_tokens_total", "Prompt tokens sent to the LLM", self._prompt_tokens),
+                ("equaliser_llm_completion_tokens_total", "Completion tokens returned by the LLM", self._completion_tokens),
+                ("equaliser_llm_cost_usd_total", "Estimated LLM spend in USD", self._cost_usd),
+            )
+            for name, help_text, values in counters:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (stage, mode), value in sorted(values.items()):
+                    lines.append(f'{name}{{stage="{stage}",mode="{mode}"}} {value}')
+
+            name = "equaliser_stage_latency_seconds"
+            lines += [f"# HELP {name} Stage latency", f"# TYPE {name} histogram"]
+            for (stage, mode), histogram in sorted(self._latency.items()):
+                labels = f'stage="{stage}",mode="{mode}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.total}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+            name = "equaliser_cache_lookups_total"
+            lines += [f"# HELP {name} Cache lookups by result", f"# TYPE {name} counter"]
+            for (cache, result), value in sorted(self._cache_lookups.items()):
+                lines.append(f'{name}{{cache="{cache}",result="{result}"}} {value}')
+
+        for name, help_text, read in self._gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {read()}"]
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def process_rss_bytes() -> int:
+    """Current resident set size of this process"""
+
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    # Non-Linux fallback: peak RSS is the best we can do
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def track_stage(stage: str, mode: Optional[str] = None):
+    """Time and trace a pipeline stage; pass the yielded callback to LLM calls to capture token usage"""
+
+    usage = UsageCallback()
+    mode = current_mode.get() if mode is None else mode
+
+    with span(stage, session_id=current_session_id.get(), mode=mode or None) as stage_span:
+        started = time.perf_counter()
+        try:
+            yield usage
+        finally:
+            metrics.observe(stage, time.perf_counter() - started, usage, mode=mode)
+
+            if usage.llm_calls:
+                stage_span.set_attribute("llm_calls", usage.llm_calls)
+                stage_span.set_attribute("prompt_chars", usage.prompt_chars)
+                stage_span.set_attribute("prompt_tokens", usage.prompt_tokens)
+                stage_span.set_attribute("completion_tokens", usage.completion_tokens)
@@ -1,3 +1,10 @@
+from functools import lru_cache
+
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from .schema_compiler import compact_parser
+from .schemas import CaseFactsPatch, MessageIntent, QuestionSchema, UserEmotions
+
 EQUALISER_SYSTEM_PROMPT = """
 You are a calm, supportive conversational guide.
 Your role is to help the user express their situation in their own words, feel understood, and gradually gain clarity.
@@ -13,4 +20,85 @@ Core principles:
 - Help the user move toward a clear, neutral summary and possible next steps without pressure.
 
 Your goal is not to push decisions, but to help the user feel clearer, more grounded, and in control of what happens next.
-"""
\ No newline at end of file
+"""
+
+
+# Prompt templates and parsers are built once per process. Every prompt is laid
+# out as static instructions -> output schema -> per-turn content, so the
+# leading messages are byte-identical across turns and sessions and qualify for
+# provider-side prefix caching.
+
+INTENT_PARSER = compact_parser(MessageIntent)
+FACTS_PARSER = compact_parser(CaseFactsPatch)
+EMOTIONS_PARSER = compact_parser(UserEmotions)
+QUESTION_PARSER = compact_parser(QuestionSchema)
+
+INTENT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "From the chat history, determine the user's intent.\n\n"
+     "Field explanations:\n"
+     "* listen = default mode, should be prefered unless otherwise\n"
+     "* guide = Give questions if diverging intentions\n"
+     "* educate = Use RAG to give factual answer\n\n"
+     "{format}"),
+    ("human", "Chat history:\n{history}"),
+]).partial(format=INTENT_PARSER.get_format_instructions())
+
+FACTS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "From the new messages, fill out only the fields they state or correct. "
+     "Leave every other field null. The earlier message is context only.\n\n"
+     "{format}"),
+    ("human", "Earlier message:\n{context}\n\nNew messages:\n{history}"),
+]).partial(format=FACTS_PARSER.get_format_instructions())
+
+EMOTIONS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "From the chat history, list the user's current emotions and sentiments.\n\n{format}"),
+    ("human", "Chat history:\n{history}"),
+]).partial(format=EMOTIONS_PARSER.get_format_instructions())
+
+GUIDE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "Based on the user's intentions, create 4 questions prompting them to select what's most important.\n\n"
+     "{format}"),
+    ("human",
+     "Chat history:\n{history}\n\n"
+     "User input: {input}\n"
+     "User intention: {intent}\n"
+     "Missing fields: {missing}\n"
+     "Unclear fields: {unclear}"),
+]).partial(format=QUESTION_PARSER.get_format_instructions())
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "You keep a running summary of a legal intake conversation. Merge the new "
+     "messages into the summary so far and reply with the updated summary only. "
+     "Keep every concrete fact: people, relationships, dates, events, money, "
+     "property, children, safety concerns, deadlines and what the client wants. "
+     "Drop greetings and small talk."),
+    ("human", "Summary so far:\n{summary}\n\nNew messages:\n{history}"),
+])
+
+RESPONSE_INSTRUCTIONS = (
+    "Please generate a natural empathic response that guides you and the user "
+    "to a better understanding of their situation."
+)
+
+
+@lru_cache(maxsize=None)
+def response_prompt(system_prompt: str) -> ChatPromptTemplate:
+    """Chat response template for a system prompt; the per-turn analysis follows the history"""
+
+    return ChatPromptTemplate.from_messages([
+        ("system", system_prompt + "\n\n" + RESPONSE_INSTRUCTIONS),
+
+        MessagesPlaceholder(variable_name="history"),
+
+        ("system",
+         "Current user intent: {intent}\n"
+         "User sentiment: {sentiment}\n"
+         "Retrieved facts: {context}\n"
+         "Missing case facts: {missing}"),
+
+        ("human", "{input}"),
+    ])
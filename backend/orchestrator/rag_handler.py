@@ -1,17 +1,102 @@
+from typing import Hashable, List, NamedTuple, Optional, Sequence
+import asyncio
+
+from .answer_cache import answer_cache
+from .metrics import metrics, track_stage
+from .tracing import record_cache_hit
+
+
+class Retrieval(NamedTuple):
+    """Fetched chunks, not yet counted against or stored in the answer cache"""
+
+    chunks: List[str]
+    embedding: Optional[Sequence[float]] = None
+    scope: Hashable = None
+    cached: bool = False
+
+
 class RAGHandler:
-    """Handles RAG operations"""
-    
-    def __init__(self, embedder):
+    """Handles RAG operations
+
+    Retrieval returns the top documents' text as a list, best first, so the
+    response prompt can budget whole chunks. Retrieved context is shared
+    across sessions through the semantic answer cache. scope returns what a
+    cached answer must match besides the query, e.g. the case's matter type
+    and jurisdiction.
+
+    retrieve/aretrieve fetch and use in one step. A speculative retrieval
+    calls afetch and only passes the result to use() if the turn needs it,
+    so unused results are neither cached nor counted as lookups.
+    """
+
+    def __init__(self, embedder, scope=None, cache=answer_cache):
         self.embedder = embedder
-    
-    def retrieve(self, query: str, top_k: int = 3) -> str:
-        """Retrieve relevant context for query"""
-        
-        results = self.embedder.retriever.invoke(query)
-        
-        context = "\n\n".join([
-            chunk.page_content 
-            for chunk in results[:top_k]
-        ])
-        
-        return context
\ No newline at end of file
+        self.scope = scope or (lambda: None)
+        self.cache = cache if cache is not None and cache.max_entries > 0 else None
+
+    def retrieve(self, query: str, top_k: int = 3) -> List[str]:
+        """Retrieve relevant chunks for query, best first"""
+        return self.use(self.fetch(query, top_k))
+
+    async def aretrieve(self, query: str, top_k: int = 3) -> List[str]:
+        """Async variant of retrieve"""
+        return self.use(await self.afetch(query, top_k))
+
+    def fetch(self, query: str, top_k: int = 3) -> Retrieval:
+        """Look the query up in the answer cache, searching the vector store on a miss"""
+
+        with track_stage("retrieval"):
+            if self.cache is None:
+                return Retrieval(self._chunks(self.embedder.retriever.invoke(query), top_k))
+
+            embedding = self.embedder.embeddings_model.embed_query(query)
+            self.cache.sync_version(self.embedder.collection_version)
+
+            scope = self.scope()
+            chunks = self.cache.lookup(embedding, scope)
+            if chunks is not None:
+                return Retrieval(chunks, embedding, scope, cached=True)
+
+            chunks = self._chunks(self.embedder.vectordb.max_marginal_relevance_search_by_vector(
+                embedding, **self.embedder.retriever.search_kwargs
+            ), top_k)
+            return Retrieval(chunks, embedding, scope)
+
+    async def afetch(self, query: str, top_k: int = 3) -> Retrieval:
+        """Async variant of fetch"""
+
+        with track_stage("retrieval"):
+            if self.cache is None:
+                return Retrieval(self._chunks(await self.embedder.retriever.ainvoke(query), top_k))
+
+            embedding = await self.embedder.embeddings_model.aembed_query(query)
+            # Reading the collection version is blocking Chroma I/O
+            await asyncio.to_thread(self.cache.sync_version, self.embedder.collection_version)
+
+            scope = self.scope()
+            chunks = self.cache.lookup(embedding, scope)
+            if chunks is not None:
+                return Retrieval(chunks, embedding, scope, cached=True)
+
+            chunks = self._chunks(await self.embedder.vectordb.amax_marginal_relevance_search_by_vector(
+                embedding, **self.embedder.retriever.search_kwargs
+            ), top_k)
+            return Retrieval(chunks, embedding, scope)
+
+    def use(self, retrieval: Retrieval) -> List[str]:
+        """Count the lookup and cache a miss's result, now that it is being used"""
+
+        if self.cache is None or retrieval.embedding is None:
+            return retrieval.chunks
+
+        metrics.cache_lookup("answer", retrieval.cached)
+        if retrieval.cached:
+            record_cache_hit("answer_cache")
+        else:
+            self.cache.store(retrieval.embedding, retrieval.scope, retrieval.chunks)
+
+        return retrieval.chunks
+
+    @staticmethod
+    def _chunks(results, top_k: int) -> List[str]:
+        return [chunk.page_content for chunk in results[:top_k]]
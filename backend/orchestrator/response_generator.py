@@ -1,101 +1,177 @@
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.messages import get_buffer_string
 from .schemas import QuestionSchema, FieldCompletenessTracker
+from .admission import llm_admission
+from .context_assembler import ContextAssembler
+from .metrics import track_stage
+from .prompts import GUIDE_PROMPT, QUESTION_PARSER, RESPONSE_INSTRUCTIONS, response_prompt
+from .tokens import token_counter
+from .tracing import current_span
 from langchain_core.output_parsers import StrOutputParser
 
 
 class ResponseGenerator:
     """Generates responses based on mode"""
-    
-    def __init__(self, llm, system_prompt, rag_handler=None):
+
+    def __init__(self, llm, system_prompt, rag_handler=None, context_budgets=None):
         self.llm = llm
         self.system_prompt = system_prompt
         self.rag_handler = rag_handler
-        
-        self.chat_template = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-
-            MessagesPlaceholder(variable_name="history"),
-
-            ("system",
-             
-            "Please generate a natural empathic response that guides the you and the user to a better understanding of their situation"
-
-            
-            "Current user intent: {intent}\n"
-            "User sentiment: {sentiment}\n"
-            "Retrieved Facts: {context}"
-            "Missing case facts:\n {missing}"
-            ),
-
-            ("human", "{input}")
-        ])
-    
+
+        # Keeps history, retrieved chunks and missing fields within fixed token budgets
+        self.assembler = ContextAssembler(
+            token_counter(getattr(llm, "model_name", None)),
+            system_prompt + "\n\n" + RESPONSE_INSTRUCTIONS,
+            context_budgets,
+        )
+
+        # Compiled once per process and system prompt; the static prefix comes first
+        self.chat_template = response_prompt(system_prompt)
+
+        self.listen_chain = self.chat_template | llm
+        self.stream_chain = self.chat_template | llm | StrOutputParser()
+        self.guide_chain = GUIDE_PROMPT | llm | QUESTION_PARSER
+
+    def _assemble(self, history, completion_tracker: FieldCompletenessTracker, context=None):
+        """Fit history, retrieved chunks and missing fields to their budgets, recording the sizes on the current span"""
+
+        assembled = self.assembler.assemble(history.messages, context, completion_tracker.missing_critical_fields)
+
+        span = current_span()
+        if span is not None:
+            for section, tokens in assembled.tokens.items():
+                span.set_attribute(f"context_tokens_{section}", tokens)
+            span.set_attribute("context_messages_dropped", len(history.messages) - len(assembled.history))
+
+        return assembled
+
+    def _listen_inputs(self, user_input: str, intent: str, history, completion_tracker: FieldCompletenessTracker, context=None) -> dict:
+        """Build the chat template inputs for a listen turn"""
+
+        assembled = self._assemble(history, completion_tracker, context)
+
+        return {
+            "history": assembled.history,        # List[BaseMessage]
+            "intent": intent,
+            "context": assembled.context,
+            "sentiment": completion_tracker.user_emotions,
+            "input": user_input,
+            "missing": assembled.missing
+        }
+
+    def _guide_inputs(self, user_input: str, intent: str, history, completion_tracker: FieldCompletenessTracker) -> dict:
+        """Build the guide prompt inputs"""
+
+        assembled = self._assemble(history, completion_tracker)
+
+        return {
+            "history": get_buffer_string(assembled.history),
+            "input": user_input,
+            "intent": intent,
+            "missing": assembled.missing,
+            "unclear": completion_tracker.uncertain_fields
+        }
+
     def listen(self, user_input: str, intent: str, history, completion_tracker: FieldCompletenessTracker, context = None) -> str:
         """Standard empathetic chat response"""
-        
-        chain = self.chat_template | self.llm
-        response = chain.invoke({
-                "history": history.messages,        # List[BaseMessage]
-                "intent": intent,
-                "context": context,
-                "sentiment": completion_tracker.user_emotions,
-                "input": user_input,
-                "missing": completion_tracker.missing_critical_fields
-            })
-            
-        
+
+        with llm_admission.sync_slot(), track_stage("response") as usage:
+            response = self.listen_chain.invoke(
+                self._listen_inputs(user_input, intent, history, completion_tracker, context),
+                config={"callbacks": [usage]},
+            )
+
         return response.content
-    
+
+    async def alisten(self, user_input: str, intent: str, history, completion_tracker: FieldCompletenessTracker, context=None) -> str:
+        """Async variant of listen"""
+
+        async with llm_admission.slot():
+            with track_stage("response") as usage:
+                response = await self.listen_chain.ainvoke(
+                    self._listen_inputs(user_input, intent, history, completion_tracker, context),
+                    config={"callbacks": [usage]},
+                )
+
+        return response.content
+
+    async def astream_listen(self, user_input: str, intent: str, history, completion_tracker: FieldCompletenessTracker, context=None):
+        """Stream a listen response token by token"""
+
+        # The slot is held until the stream finishes
+        async with llm_admission.slot():
+            with track_stage("response") as usage:
+                async for token in self.stream_chain.astream(
+                    self._listen_inputs(user_input, intent, history, completion_tracker, context),
+                    config={"callbacks": [usage]},
+                ):
+                    yield token
+
     def educate(self, user_input: str, intent: str, history, completion_tracker=None) -> str:
         """Provide factual legal information with RAG"""
-        
+
         if not self.rag_handler:
-            return self.listen(user_input, "seeking_information", history)
-        
+            return self.listen(user_input, "seeking_information", history, completion_tracker)
+
         # Retrieve relevant context
         context = self.rag_handler.retrieve(user_input)
-        
+
         response = self.listen(user_input, intent, history, context=context, completion_tracker=completion_tracker)
-        
+
         return response
-    
-    def guide(self, user_input: str, intent: str, completion_tracker: FieldCompletenessTracker, history) -> str:
-        """Generate multiple choice questions"""
-        
-        parser = PydanticOutputParser(pydantic_object=QuestionSchema)
-        
-        template = PromptTemplate(
-            template="""Based on user's intentions, create 4 questions prompting them to select what's most important.
-            
-            Format: {format}
-            
-            Chat history: {history}
-            User Input: {input}
-            User Intention: {intent}
-            Missing fields: {missing}
-            Unclear fields: {unclear}
-            """,
-            input_variables=["history", "input", "intent", "missing", "unclear"],
-            partial_variables={"format": parser.get_format_instructions()}
-        )
-        
-        chain = template | self.llm | parser
-        
-        result = chain.invoke({
-            "history": history.messages,
-            "input": user_input,
-            "intent": intent,
-            "missing": completion_tracker.missing_critical_fields,
-            "unclear": completion_tracker.uncertain_fields
-        })
-        
-        # Format as text
+
+    async def aeducate(self, user_input: str, intent: str, history, completion_tracker=None, context=None) -> str:
+        """Async variant of educate; context may be supplied if already retrieved"""
+
+        if context is None and not self.rag_handler:
+            return await self.alisten(user_input, "seeking_information", history, completion_tracker)
+
+        if context is None:
+            context = await self.rag_handler.aretrieve(user_input)
+
+        return await self.alisten(user_input, intent, history, context=context, completion_tracker=completion_tracker)
+
+    async def astream_educate(self, user_input: str, intent: str, history, completion_tracker=None, context=None):
+        """Stream an educate response token by token; context may be supplied if already retrieved"""
+
+        if context is None and not self.rag_handler:
+            async for token in self.astream_listen(user_input, "seeking_information", history, completion_tracker):
+                yield token
+            return
+
+        if context is None:
+            context = await self.rag_handler.aretrieve(user_input)
+
+        async for token in self.astream_listen(user_input, intent, history, completion_tracker, context=context):
+            yield token
+
+    def _format_questions(self, result: QuestionSchema) -> str:
+        """Render generated questions as chat text"""
+
         questions_text = "To guide this properly, please tell me what feels most important:\n\n"
         for i, q in enumerate(result.questions, 1):
             questions_text += f"{i}. {q}\n"
-        
-        
 
         return questions_text
-    
\ No newline at end of file
+
+    def guide(self, user_input: str, intent: str, completion_tracker: FieldCompletenessTracker, history) -> str:
+        """Generate multiple choice questions"""
+
+        with llm_admission.sync_slot(), track_stage("response") as usage:
+            result = self.guide_chain.invoke(
+                self._guide_inputs(user_input, intent, history, completion_tracker),
+                config={"callbacks": [usage]},
+            )
+
+        return self._format_questions(result)
+
+    async def aguide(self, user_input: str, intent: str, completion_tracker: FieldCompletenessTracker, history) -> str:
+        """Async variant of guide"""
+
+        async with llm_admission.slot():
+            with track_stage("response") as usage:
+                result = await self.guide_chain.ainvoke(
+                    self._guide_inputs(user_input, intent, history, completion_tracker),
+                    config={"callbacks": [usage]},
+                )
+
+        return self._format_questions(result)
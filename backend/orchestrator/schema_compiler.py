@@ -0,0 +1,82 @@
+from functools import lru_cache
+from typing import Any, Literal, Union, get_args, get_origin
+import types
+
+from langchain_core.output_parsers import PydanticOutputParser
+from pydantic import BaseModel
+
+from .schemas import CaseFactsPatch, MessageIntent, QuestionSchema, UserEmotions
+
+
+def _type_spec(annotation: Any) -> str:
+    """Short type notation, e.g. "family_law"|"employment", list[str], {name, age}"""
+
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+
+    if origin is Literal:
+        return "|".join(f'"{value}"' for value in args)
+
+    if origin in (Union, types.UnionType):
+        options = [arg for arg in args if arg is not type(None)]
+        return _type_spec(options[0]) if len(options) == 1 else " or ".join(_type_spec(arg) for arg in options)
+
+    # Annotated constraints are enforced on validation, not described to the model
+    if hasattr(annotation, "__metadata__"):
+        return _type_spec(args[0])
+
+    if origin is list:
+        return f"list[{_type_spec(args[0]) if args else 'any'}]"
+
+    if origin is dict or annotation is dict:
+        return "object"
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return "{" + ", ".join(annotation.model_fields) + "}"
+
+    return {str: "str", int: "int", float: "number", bool: "bool"}.get(annotation, getattr(annotation, "__name__", "any"))
+
+
+@lru_cache(maxsize=None)
+def compile_format_instructions(model: type) -> str:
+    """Compact field specification for model, one line per field.
+
+    Carries the same information the model needs from the JSON Schema (names,
+    types, allowed values, descriptions, what's required) at a fraction of the
+    tokens. Output is still validated against the Pydantic model.
+    """
+
+    required = [name for name, field in model.model_fields.items() if field.is_required()]
+
+    lines = ["Reply with one JSON object and nothing else."]
+    if len(required) == len(model.model_fields):
+        lines.append("All keys are required.")
+    elif required:
+        lines.append(f"Required keys: {', '.join(required)}. Other keys: use null or [] when unknown.")
+    else:
+        lines.append("All keys are optional: omit them or use null when unknown.")
+    lines.append("Keys:")
+
+    for name, field in model.model_fields.items():
+        line = f"{name}: {_type_spec(field.annotation)}"
+        if field.description:
+            line += f" - {field.description}"
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+class CompactOutputParser(PydanticOutputParser):
+    """PydanticOutputParser whose format instructions come from compile_format_instructions"""
+
+    def get_format_instructions(self) -> str:
+        return compile_format_instructions(self.pydantic_object)
+
+
+def compact_parser(model: type) -> CompactOutputParser:
+    return CompactOutputParser(pydantic_object=model)
+
+
+# Compiled once at import for every schema the LLM fills
+for _model in (MessageIntent, CaseFactsPatch, UserEmotions, QuestionSchema):
+    compile_format_instructions(_model)
@@ -1,20 +1,21 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List, Literal
 
-necessary_fields = ["matter_type","key_dates",
-        "parties_involved",
-        "desired_outcome", "income_sources",
-        "estimated_monthly_income",
-        "funding_concerns","risk_level",
-        "risks_identified",
-        "urgent_action_required",
-        "urgency_score",
-        "deadline_dates",
-        "recommended_next_steps"
+# Required for every matter; orchestrator.completeness adds per-matter-type requirements
+necessary_fields = ["matter_type",
+        "brief_description",
+        "key_events",
+        "other_parties",
+        "desired_outcome",
+        "client_annual_income",
+        "ability_to_pay_legal_fees",
+        "immediate_safety_risk",
+        "urgency_level",
+        "state_territory",
         ]
 
 class FieldCompletenessTracker(BaseModel):
-    """LLM fills this to track extraction quality"""
+    """Tracks extraction quality; computed from CaseFactsSchema by orchestrator.completeness"""
     
     # Core completeness metrics
     fields_filled_count: int = Field(
@@ -66,6 +67,11 @@ class MessageIntent(BaseModel):
     needs_reassurance: bool
     suggested_response_style: Literal["listen", "educate", "guide", "act"]
 
+class UserEmotions(BaseModel):
+    user_emotions: List[str] = Field(
+        description="List of current user emotions and sentiments"
+    )
+
 class QuestionSchema(BaseModel):
     questions: List[str]
 
@@ -75,8 +81,8 @@ class QuestionSchema(BaseModel):
     #     HumanMessage(content=user_input)
     # ])
 
-from pydantic import BaseModel, Field
-from typing import Optional, List, Literal
+from pydantic import BaseModel, Field, create_model
+from typing import Annotated, Optional, List, Literal
 from datetime import date
 
 class CaseFactsSchema(BaseModel):
@@ -349,4 +355,19 @@ class CaseFactsSchema(BaseModel):
     critical_gaps: List[str] = Field(
         default_factory=list,
         description="Essential information still missing"
-    )
\ No newline at end of file
+    )
+
+
+# Same fields as CaseFactsSchema, all optional and null by default, so the LLM
+# only has to return what the latest messages state or change
+CaseFactsPatch = create_model(
+    "CaseFactsPatch",
+    __doc__="Facts stated or changed in the latest messages; every other field stays null",
+    **{
+        name: (
+            Optional[Annotated[(field.annotation, *field.metadata)] if field.metadata else field.annotation],
+            Field(default=None, description=field.description),
+        )
+        for name, field in CaseFactsSchema.model_fields.items()
+    },
+)
@@ -0,0 +1,80 @@
+"""The static prefix of every prompt must be byte-identical across turns.
+
+Run from backend/:
+
+    python -m pytest orchestrator/test_prompt_prefix.py
+"""
+
+from langchain_core.messages import AIMessage, HumanMessage, get_buffer_string
+
+from orchestrator.prompts import (
+    EMOTIONS_PROMPT,
+    EQUALISER_SYSTEM_PROMPT,
+    FACTS_PROMPT,
+    GUIDE_PROMPT,
+    INTENT_PROMPT,
+    SUMMARY_PROMPT,
+    response_prompt,
+)
+
+
+EARLY_TURN = [
+    HumanMessage(content="My husband moved out and says the house is his."),
+]
+
+LATE_TURN = [
+    HumanMessage(content="My husband moved out and says the house is his."),
+    AIMessage(content="That sounds stressful. Do you have children together?"),
+    HumanMessage(content="Yes, two kids. There's a court date on the 14th of March."),
+]
+
+
+def _inputs(turn):
+    history = get_buffer_string(turn)
+    return [
+        ("intent", INTENT_PROMPT, {"history": history}),
+        ("facts", FACTS_PROMPT, {"history": history, "context": get_buffer_string(turn[:1])}),
+        ("emotions", EMOTIONS_PROMPT, {"history": history}),
+        ("summary", SUMMARY_PROMPT, {"summary": "(none yet)", "history": history}),
+        ("guide", GUIDE_PROMPT, {
+            "history": history, "input": turn[-1].content, "intent": "asking_for_help",
+            "missing": ["state_territory"], "unclear": [],
+        }),
+        ("response", response_prompt(EQUALISER_SYSTEM_PROMPT), {
+            "history": turn, "input": turn[-1].content, "intent": "venting",
+            "sentiment": ["stressed"], "context": None, "missing": ["state_territory"],
+        }),
+    ]
+
+
+def _static_prefix(messages):
+    """Serialised leading system messages, i.e. everything before per-turn content"""
+
+    prefix = []
+    for message in messages:
+        if message.type != "system":
+            break
+        prefix.append(f"{message.type}:{message.content}")
+    return "\n".join(prefix).encode()
+
+
+def test_static_prefix_is_identical_across_turns():
+    for (name, template, early), (_, _, late) in zip(_inputs(EARLY_TURN), _inputs(LATE_TURN)):
+        early_prefix = _static_prefix(template.format_messages(**early))
+        assert early_prefix, f"{name} prompt should start with static system instructions"
+        assert early_prefix == _static_prefix(template.format_messages(**late)), name
+
+
+def test_static_prefix_holds_no_turn_content():
+    for turn in (EARLY_TURN, LATE_TURN):
+        for name, template, inputs in _inputs(turn):
+            prefix = _static_prefix(template.format_messages(**inputs)).decode()
+            for message in turn:
+                assert message.content not in prefix, name
+
+
+def test_schema_is_part_of_the_static_prefix():
+    for name, template, inputs in _inputs(LATE_TURN):
+        if name in ("intent", "facts", "emotions", "guide"):
+            prefix = _static_prefix(template.format_messages(**inputs)).decode()
+            assert "Reply with one JSON object" in prefix, name
@@ -0,0 +1,37 @@
+"""Per-turn LLM call and token budgets, replayed offline against a stub model.
+
+Run from backend/:
+
+    python -m pytest orchestrator/test_turn_budget.py
+
+Budgets live in benchmarks/turn_budgets.json; python -m benchmarks.turn_budget
+prints the per-turn costs they are checked against.
+"""
+
+import asyncio
+
+from benchmarks.turn_budget import load_budgets, over_budget, replay
+
+
+def test_every_turn_is_within_budget():
+    turns = asyncio.run(replay())
+
+    assert turns, "replay produced no turns"
+    assert over_budget(turns, load_budgets()) == []
+
+
+def test_replay_attributes_calls_to_stages():
+    first = asyncio.run(replay(["My husband moved out and says the house is his."]))[0]
+
+    assert {"intent", "response", "fact_extraction", "emotions"} <= set(first["stages"])
+    assert first["llm_calls"] == sum(stage["llm_calls"] for stage in first["stages"].values())
+    assert first["prompt_tokens"] > 0 and first["completion_tokens"] > 0
+
+
+def test_exceeding_a_budget_is_reported():
+    turns = asyncio.run(replay(["My husband moved out and says the house is his."]))
+
+    violations = over_budget(turns, {"turn": {"llm_calls": 1}, "stages": {}})
+
+    assert any("llm_calls" in violation for violation in violations)
+    assert any("has no budget" in violation for violation in violations)
@@ -0,0 +1,87 @@
+from functools import lru_cache
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Chat-format framing each message costs on top of its content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+FALLBACK_ENCODING = "o200k_base"
+
+
+class TokenCounter:
+    """Token counts from the chat model's tokenizer, cached per text.
+
+    The tiktoken encoding is only loaded by warm(), which the app runs at
+    startup; it may download the encoding file unless TIKTOKEN_CACHE_DIR
+    points at a pre-fetched copy. Until then, or if loading fails, counts
+    are a deterministic estimate of 4 characters per token, so requests
+    never wait on a download and offline runs (tests, turn budgets) always
+    count the same way. Message contents are the same string objects from
+    turn to turn, so repeat counts are a cache hit on a cached hash.
+    """
+
+    def __init__(self, model: Optional[str] = None, max_cached: int = 8192):
+        self.model = model
+        self.max_cached = max_cached
+        self._encoding = None
+        self.count = self._cached_count(None)
+
+    @property
+    def estimating(self) -> bool:
+        return self._encoding is None
+
+    def warm(self):
+        """Load the model's encoding and swap in a fresh count cache bound to it
+
+        Calls already running finish against the old function and its cache,
+        which is dropped, so no estimate can be cached after the swap.
+        """
+
+        if self._encoding is not None:
+            return
+
+        try:
+            import tiktoken
+
+            try:
+                encoding = tiktoken.encoding_for_model(self.model or "")
+            except KeyError:
+                encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+        except Exception as exc:
+            logger.warning("No tokenizer for %s (%s); estimating 4 characters per token", self.model, exc)
+            return
+
+        self.count, self._encoding = self._cached_count(encoding), encoding
+
+    def _cached_count(self, encoding):
+        def count(text: str) -> int:
+            if encoding is None:
+                return len(text) // 4
+            return len(encoding.encode(text, disallowed_special=()))
+
+        return lru_cache(maxsize=self.max_cached)(count)
+
+    def count_message(self, message) -> int:
+        return self.count(str(message.content)) + MESSAGE_OVERHEAD_TOKENS
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Leading max_tokens tokens of text"""
+
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+
+        encoding = self._encoding
+        if encoding is None:
+            return text[:max_tokens * 4]
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+@lru_cache(maxsize=None)
+def token_counter(model: Optional[str] = None) -> TokenCounter:
+    """Process-wide counter per model, so every session shares one count cache"""
+    return TokenCounter(model)
@@ -0,0 +1,146 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Optional
+import asyncio
+import json
+import logging
+import os
+import queue
+import secrets
+import time
+
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation within a turn, exported as a JSON line when it ends"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[dict] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {key: value for key, value in (attributes or {}).items() if value is not None}
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        # Field names follow the OTLP span model so a collector can ingest the file
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class RotatingJSONLWriter:
+    """Appends JSON records to a size-rotated JSONL file.
+
+    Writes happen on a background thread so they never block the event
+    loop; at most backup_count rotated files of max_bytes each are kept.
+    """
+
+    def __init__(self, path, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        handler = RotatingFileHandler(self.path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        self._queue = queue.SimpleQueue()
+        self._listener = QueueListener(self._queue, handler)
+        self._listener.start()
+
+        # One logger per file, so writers never see each other's records
+        self._logger = logging.getLogger(f"{__name__}.jsonl.{self.path.resolve()}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(QueueHandler(self._queue))
+
+    def write(self, record: dict):
+        self._logger.info(json.dumps(record, default=str))
+
+    def shutdown(self):
+        """Flush queued records and close the file"""
+
+        self._listener.stop()
+
+
+class JSONLSpanExporter(RotatingJSONLWriter):
+    """Writes finished spans, one per line"""
+
+    def export(self, span: Span):
+        self.write(span.to_dict())
+
+
+def configured_exporter() -> Optional[JSONLSpanExporter]:
+    """Span exporter for TRACE_EXPORT_PATH, or None when it is unset"""
+
+    path = os.getenv("TRACE_EXPORT_PATH")
+    if not path or path.lower() == "none":
+        return None
+
+    return JSONLSpanExporter(
+        path,
+        max_bytes=int(os.getenv("TRACE_MAX_BYTES", 50 * 1024 * 1024)),
+        backup_count=int(os.getenv("TRACE_BACKUP_COUNT", 5)),
+    )
+
+
+# Set by the app at startup; spans are only timed, not written, until then
+exporter = None
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def record_cache_hit(kind: str):
+    """Count a cache hit on the enclosing span"""
+
+    active = _current_span.get()
+    if active is not None:
+        active.attributes["cache_hits"] = active.attributes.get("cache_hits", 0) + 1
+        active.attributes.setdefault("cache_hit_kinds", []).append(kind)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Open a span nested under the current one for the duration of the block"""
+
+    active = Span(name, parent=_current_span.get(), attributes=attributes)
+    token = _current_span.set(active)
+    try:
+        yield active
+    except (asyncio.CancelledError, GeneratorExit):
+        active.status = "cancelled"
+        raise
+    except BaseException as exc:
+        active.status = "error"
+        active.set_attribute("error", type(exc).__name__)
+        raise
+    finally:
+        active.end_ns = time.time_ns()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Closed from another context, e.g. an abandoned streaming generator
+            pass
+        if exporter is not None:
+            exporter.export(active)
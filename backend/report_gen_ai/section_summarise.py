@@ -8,6 +8,15 @@ from langchain_core.prompts import SystemMessagePromptTemplate, ChatPromptTempla
 
 from langchain_core.language_models.chat_models import BaseChatModel
 
+import sys
+import os
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.admission import llm_admission, Priority
+from orchestrator.metrics import track_stage
+
 
 SECTION_SYSTEM_PROMPT_TEMPLATE = (
     "Your task is to draft the {__SECTION_HEADING__} section of a legal intake report. "
@@ -74,7 +83,10 @@ async def design_section(conversation: str, section: Dict, report: str, llm):
     ("human", "{conversation}")
         ])
 
-    response = llm.invoke(prompt.format(conversation=conversation))
+    # Report generation yields to live chat turns for LLM capacity
+    async with llm_admission.slot(Priority.REPORT):
+        with track_stage("report_section", mode="report") as usage:
+            response = await llm.ainvoke(prompt.format(conversation=conversation), config={"callbacks": [usage]})
 
     print(response.content)
 
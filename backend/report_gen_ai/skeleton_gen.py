@@ -5,6 +5,14 @@ from pydantic import BaseModel, Field
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import SystemMessagePromptTemplate, ChatPromptTemplate, HumanMessagePromptTemplate
+import sys
+import os
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.admission import llm_admission, Priority
+from orchestrator.metrics import track_stage
 
 SYSTEM_PROMPT = (
     "Your task is to create a structured skeleton for a legal intake report based on a conversation between a client "
@@ -114,7 +122,9 @@ async def design_report_skeleton(serialized_conversation: str, llm: ChatOpenAI |
     )
     prompt = prompt.format_prompt(user_prompt=serialized_conversation)
 
-    output = await llm.ainvoke(prompt.to_messages())
+    async with llm_admission.slot(Priority.REPORT):
+        with track_stage("report_skeleton", mode="report") as usage:
+            output = await llm.ainvoke(prompt.to_messages(), config={"callbacks": [usage]})
 
     parsed_output = output_parser.parse(output.content)
 
@@ -0,0 +1,119 @@
+import threading
+
+import httpx
+
+
+DEFAULT_CHAT_MODEL = "gpt-4o-mini-2024-07-18"
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+class ResourceRegistry:
+    """Process-wide LLM, embedding and vector store clients shared by every session.
+
+    Chat models and the Chroma-backed embedder are built once on first use and
+    reused; all OpenAI traffic goes through one pooled pair of HTTP clients.
+    Sessions receive lightweight views via session_resources().
+    """
+
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20, timeout: float = 60.0):
+        self._lock = threading.Lock()
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._timeout = timeout
+
+        self._http_client = None
+        self._http_async_client = None
+        self._llms = {}
+        self._embedder = None
+
+    @property
+    def http_client(self) -> httpx.Client:
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(limits=self._limits, timeout=self._timeout)
+            return self._http_client
+
+    @property
+    def http_async_client(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._http_async_client is None:
+                self._http_async_client = httpx.AsyncClient(limits=self._limits, timeout=self._timeout)
+            return self._http_async_client
+
+    def llm(self, model: str = DEFAULT_CHAT_MODEL):
+        """Shared chat model client for the given model name"""
+
+        # Imported on first use: langchain_openai dominates the app's import time
+        from langchain_openai import ChatOpenAI
+        from orchestrator.llm_cache import chat_model_kwargs
+
+        http_client, http_async_client = self.http_client, self.http_async_client
+
+        with self._lock:
+            if model not in self._llms:
+                self._llms[model] = ChatOpenAI(
+                    model=model,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                    # Report token usage on streamed responses too, for metrics
+                    stream_usage=True,
+                    # Record/replay cache for offline runs (LLM_CACHE_MODE)
+                    **chat_model_kwargs(),
+                )
+            return self._llms[model]
+
+    def embedder(self):
+        """Shared embedder holding the process's Chroma client"""
+
+        from langchain_openai import OpenAIEmbeddings
+        from embedding_pipeline.embedder import Embedder
+
+        http_client, http_async_client = self.http_client, self.http_async_client
+
+        with self._lock:
+            if self._embedder is None:
+                self._embedder = Embedder(
+                    embeddings_model=OpenAIEmbeddings(
+                        model=DEFAULT_EMBEDDING_MODEL,
+                        http_client=http_client,
+                        http_async_client=http_async_client,
+                    )
+                )
+            return self._embedder
+
+    def warm(self):
+        """Build the shared clients ahead of the first session"""
+
+        self.llm()
+        self.embedder()
+
+    def session_resources(self, model: str = DEFAULT_CHAT_MODEL) -> dict:
+        """Keyword arguments for a new ChatOrchestrator backed by the shared clients"""
+
+        llm = self.llm(model)
+
+        return {
+            "llm": llm,
+            "assistant_llm": llm,
+            "embedder": self.embedder().session_view(),
+        }
+
+    async def aclose(self):
+        """Close pooled HTTP connections, e.g. on application shutdown"""
+
+        with self._lock:
+            http_client, self._http_client = self._http_client, None
+            http_async_client, self._http_async_client = self._http_async_client, None
+            self._llms.clear()
+            self._embedder = None
+
+        if http_client is not None:
+            http_client.close()
+        if http_async_client is not None:
+            await http_async_client.aclose()
+
+
+# Process-wide registry used by app.py and main.py
+registry = ResourceRegistry()
@@ -0,0 +1,180 @@
+from pathlib import Path
+from typing import Optional, Tuple
+import json
+import sqlite3
+import threading
+import time
+
+from orchestrator.memory_manager import MemoryManager
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_state (
+    session_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    short_term_epoch INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS session_messages (
+    session_id TEXT NOT NULL,
+    history TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    PRIMARY KEY (session_id, history, seq)
+) WITHOUT ROWID;
+"""
+
+
+class SnapshotConflict(RuntimeError):
+    """Raised when a save is based on an older version than the one stored"""
+
+
+class SQLiteSnapshotStore:
+    """Durable ChatOrchestrator snapshots in a local SQLite file.
+
+    Messages are stored one row each and only messages added since the last
+    save are written; the small scalar state (case facts, tracker, counters)
+    is upserted as one JSON row. Every save bumps a per-session version so a
+    worker can tell whether its in-memory copy is stale, and a save from a
+    copy that is no longer the latest raises SnapshotConflict instead of
+    overwriting another worker's turn.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def version(self, session_id: str) -> Optional[int]:
+        """Latest persisted version for a session, or None if it was never saved"""
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM session_state WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def save(self, session_id: str, client) -> int:
+        """Save a client's current state and return the new version (see write)"""
+
+        version = self.write(session_id, client.snapshot(), client.snapshot_version)
+        client.snapshot_version = version
+        return version
+
+    def write(self, session_id: str, snapshot: dict, base_version: int) -> int:
+        """Write the delta of a ChatOrchestrator.snapshot() since the last save and return the new version.
+
+        Only the given dict is read, so a snapshot built on the event loop
+        can be written from a worker thread while the client keeps changing.
+        Raises SnapshotConflict if base_version is not the stored version.
+        """
+
+        memory = snapshot["memory"]
+        state = json.dumps({key: value for key, value in snapshot.items() if key != "memory"}, separators=(",", ":"))
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT version, short_term_epoch FROM session_state WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()
+                stored_version = row[0] if row else 0
+                if stored_version != base_version:
+                    raise SnapshotConflict(
+                        f"Session {session_id} is at version {stored_version}, "
+                        f"this copy was loaded at {base_version}"
+                    )
+
+                stored_counts = dict(self._conn.execute(
+                    "SELECT history, COUNT(*) FROM session_messages WHERE session_id = ? GROUP BY history",
+                    (session_id,),
+                ).fetchall())
+
+                for name in MemoryManager.HISTORY_NAMES:
+                    messages = memory[name]
+                    start = stored_counts.get(name, 0)
+
+                    # Condensation rebuilds short-term memory, so it is rewritten rather than appended
+                    rebuilt = name == "short_term_memory" and row is not None and row[1] != memory["short_term_epoch"]
+                    if rebuilt or start > len(messages):
+                        self._conn.execute(
+                            "DELETE FROM session_messages WHERE session_id = ? AND history = ?",
+                            (session_id, name),
+                        )
+                        start = 0
+
+                    self._conn.executemany(
+                        "INSERT INTO session_messages (session_id, history, seq, message) VALUES (?, ?, ?, ?)",
+                        [
+                            (session_id, name, seq, json.dumps(msg, separators=(",", ":")))
+                            for seq, msg in enumerate(messages[start:], start)
+                        ],
+                    )
+
+                version = stored_version + 1
+                if row is None:
+                    self._conn.execute(
+                        """
+                        INSERT INTO session_state (session_id, version, short_term_epoch, state, updated_at)
+                        VALUES (?, ?, ?, ?, ?)
+                        """,
+                        (session_id, version, memory["short_term_epoch"], state, time.time()),
+                    )
+                else:
+                    updated = self._conn.execute(
+                        """
+                        UPDATE session_state
+                        SET version = ?, short_term_epoch = ?, state = ?, updated_at = ?
+                        WHERE session_id = ? AND version = ?
+                        """,
+                        (version, memory["short_term_epoch"], state, time.time(), session_id, stored_version),
+                    )
+                    if updated.rowcount != 1:
+                        raise SnapshotConflict(f"Session {session_id} changed while saving")
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return version
+
+    def load(self, session_id: str) -> Optional[Tuple[dict, int]]:
+        """Return (snapshot, version) for a session, or None if it was never saved"""
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, short_term_epoch, state FROM session_state WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            rows = self._conn.execute(
+                "SELECT history, message FROM session_messages WHERE session_id = ? ORDER BY history, seq",
+                (session_id,),
+            ).fetchall()
+
+        version, short_term_epoch, state = row
+        memory = {name: [] for name in MemoryManager.HISTORY_NAMES}
+        for history, message in rows:
+            memory[history].append(json.loads(message))
+        memory["short_term_epoch"] = short_term_epoch
+
+        snapshot = json.loads(state)
+        snapshot["memory"] = memory
+        return snapshot, version
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM session_state WHERE session_id = ?", (session_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,191 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """Interface for session backends used by app.py"""
+
+    @abstractmethod
+    def get(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def put(self, session_id: str, session) -> None:
+        ...
+
+    @abstractmethod
+    def pop(self, session_id: str):
+        ...
+
+    def evict_expired(self) -> int:
+        """Drop expired sessions, returning how many; backends without a TTL keep the default"""
+        return 0
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def __contains__(self, session_id: str) -> bool:
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """Bounded in-process session store with idle TTL and LRU eviction.
+
+    Sessions idle for longer than idle_ttl seconds are dropped, and once
+    max_sessions or max_bytes is exceeded the least recently used sessions
+    are evicted. on_evict(session_id, session, reason) runs before a session
+    is released so callers can snapshot it.
+    """
+
+    def __init__(
+        self,
+        idle_ttl: Optional[float] = 1800,
+        max_sessions: Optional[int] = 1000,
+        max_bytes: Optional[int] = None,
+        on_evict: Optional[Callable] = None,
+        sizer: Optional[Callable] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.sizer = sizer or (lambda session: session.approx_size_bytes())
+        self.clock = clock
+
+        self._lock = threading.RLock()
+        # session_id -> [session, last_access, approx_bytes], oldest access first
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._evictions = {"ttl": 0, "count": 0, "bytes": 0}
+
+    def get(self, session_id: str):
+        """Return the session and mark it as recently used, or None if missing/expired"""
+
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+
+            if self._is_expired(entry):
+                self._evict(session_id, "ttl")
+                return None
+
+            entry[1] = self.clock()
+            self._entries.move_to_end(session_id)
+            return entry[0]
+
+    def put(self, session_id: str, session) -> None:
+        """Insert or refresh a session, re-measuring its size and enforcing limits"""
+
+        size = self.sizer(session)
+
+        with self._lock:
+            previous = self._entries.pop(session_id, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+
+            self._entries[session_id] = [session, self.clock(), size]
+            self._bytes += size
+
+            self.evict_expired()
+            self._enforce_limits(keep=session_id)
+
+    def pop(self, session_id: str):
+        """Remove a session without running the eviction callback"""
+
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is None:
+                return None
+            self._bytes -= entry[2]
+            return entry[0]
+
+    def clear(self) -> None:
+        """Remove every session without running the eviction callback"""
+
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def evict_expired(self) -> int:
+        """Drop every session idle for longer than idle_ttl"""
+
+        if self.idle_ttl is None:
+            return 0
+
+        with self._lock:
+            # Entries are ordered by last access, so stop at the first live one
+            expired = []
+            for session_id, entry in self._entries.items():
+                if not self._is_expired(entry):
+                    break
+                expired.append(session_id)
+
+            for session_id in expired:
+                self._evict(session_id, "ttl")
+
+            return len(expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._entries),
+                "approx_bytes": self._bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "idle_ttl": self.idle_ttl,
+                "evictions": dict(self._evictions),
+            }
+
+    def _is_expired(self, entry) -> bool:
+        return self.idle_ttl is not None and self.clock() - entry[1] > self.idle_ttl
+
+    def _enforce_limits(self, keep: str):
+        while len(self._entries) > 1:
+            if self.max_sessions is not None and len(self._entries) > self.max_sessions:
+                reason = "count"
+            elif self.max_bytes is not None and self._bytes > self.max_bytes:
+                reason = "bytes"
+            else:
+                return
+
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                return
+            self._evict(oldest, reason)
+
+    def _evict(self, session_id: str, reason: str):
+        entry = self._entries[session_id]
+
+        if self.on_evict is not None:
+            try:
+                self.on_evict(session_id, entry[0], reason)
+            except Exception:
+                logger.exception("Eviction callback failed for session %s", session_id)
+
+        del self._entries[session_id]
+        self._bytes -= entry[2]
+        self._evictions[reason] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._entries
@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TurnCoordinator:
+    """Serialises turns per session and deduplicates retried requests.
+
+    Turns for the same session run one at a time. When a request carries an
+    idempotency key, a retry with the same key awaits the in-flight turn or
+    gets its cached result instead of running the pipeline again.
+    """
+
+    def __init__(self, max_cached_results: int = 10000):
+        self.max_cached_results = max_cached_results
+
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._lock_users: dict[str, int] = {}
+        # (session_id, idempotency_key) -> task, most recently used last
+        self._results: OrderedDict = OrderedDict()
+
+    @asynccontextmanager
+    async def session_lock(self, session_id: str):
+        """Hold the session's turn lock; locks are dropped once nobody is waiting"""
+
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        self._lock_users[session_id] = self._lock_users.get(session_id, 0) + 1
+
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[session_id] -= 1
+            if self._lock_users[session_id] == 0:
+                del self._lock_users[session_id]
+                del self._locks[session_id]
+
+    async def run(self, session_id: str, idempotency_key: Optional[str], turn: Callable[[], Awaitable]):
+        """Run turn() under the session lock, reusing the result for repeated idempotency keys"""
+
+        if idempotency_key is None:
+            return await self._run_locked(session_id, turn)
+
+        cache_key = (session_id, idempotency_key)
+        task = self._results.get(cache_key)
+
+        if task is not None:
+            logger.info("Reusing turn for session %s, idempotency key %s", session_id, idempotency_key)
+            self._results.move_to_end(cache_key)
+        else:
+            task = asyncio.ensure_future(self._run_locked(session_id, turn))
+            task.add_done_callback(lambda done: self._discard_failed(cache_key, done))
+            self._results[cache_key] = task
+
+            while len(self._results) > self.max_cached_results:
+                self._results.popitem(last=False)
+
+        # Shield so a disconnected client doesn't cancel the turn its retry is waiting on
+        return await asyncio.shield(task)
+
+    def forget(self, session_id: str):
+        """Drop cached results for a session, e.g. when it is evicted"""
+
+        for cache_key in [key for key in self._results if key[0] == session_id]:
+            del self._results[cache_key]
+
+    async def _run_locked(self, session_id: str, turn: Callable[[], Awaitable]):
+        async with self.session_lock(session_id):
+            return await turn()
+
+    def _discard_failed(self, cache_key, task: asyncio.Task):
+        # Failed turns are not cached, so a retry runs the pipeline again
+        if task.cancelled() or task.exception() is not None:
+            if self._results.get(cache_key) is task:
+                del self._results[cache_key]